@@ -0,0 +1,364 @@
+"""
+Single pass analytics over the crawl archive: every requested report is an
+aggregator fed each (url, {word: count}) record of one streaming pass. The
+results are cached next to the archive, keyed by the size and modification
+time of its files, so asking again (e.g. with other outlier thresholds)
+does not read the archive, and a new report only needs a pass for itself.
+With processes > 1 the pass is a map-reduce: the archive is split into
+chunks (line aligned byte ranges, or page ranges of a .tfa archive), each
+counted by its own aggregators in a process pool, and the partial results
+are merged pairwise in archive order.
+
+    reports = run_reports("Logs/data_17723.json", ["token_counts", "common_words"], processes=4)
+"""
+import json
+import os
+import pickle
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+from archive_writer import archive_parts
+from url_filter import url_blocks
+
+# Report aggregators by name, see register_report.
+REPORTS = dict()
+
+
+def register_report(name):
+    def register(aggregator):
+        REPORTS[name] = aggregator
+        return aggregator
+    return register
+
+
+def get_report(name):
+    try:
+        return REPORTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown report {name}, expected one of {', '.join(sorted(REPORTS))}.")
+
+
+class Aggregator(object):
+    """
+    A report: add() is called with every record of the archive, then result().
+    merge() adds the records another aggregator of the same report was given,
+    which come after its own in the archive.
+    """
+    def add(self, url, word_freqs):
+        raise NotImplementedError
+
+    def merge(self, other):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+@register_report("urls")
+class UrlsReport(Aggregator):
+    """ Set of the archived urls. """
+    def __init__(self):
+        self.urls = set()
+
+    def add(self, url, word_freqs):
+        self.urls.add(url)
+
+    def merge(self, other):
+        self.urls.update(other.urls)
+
+    def result(self):
+        return self.urls
+
+
+@register_report("token_counts")
+class TokenCountsReport(Aggregator):
+    """ {url: number of tokens}, the last record of a url archived twice. """
+    def __init__(self):
+        self.counts = dict()
+
+    def add(self, url, word_freqs):
+        self.counts[url] = sum(word_freqs.values())
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    def result(self):
+        return self.counts
+
+
+@register_report("block_lengths")
+class BlockLengthsReport(Aggregator):
+    """ {url: number of non-empty '/' blocks}. """
+    def __init__(self):
+        self.lengths = dict()
+
+    def add(self, url, word_freqs):
+        self.lengths[url] = url_blocks(url)
+
+    def merge(self, other):
+        self.lengths.update(other.lengths)
+
+    def result(self):
+        return self.lengths
+
+
+@register_report("common_words")
+class CommonWordsReport(Aggregator):
+    """ Counter of every word over every record. """
+    def __init__(self):
+        self.words = Counter()
+
+    def add(self, url, word_freqs):
+        self.words.update(word_freqs)
+
+    def merge(self, other):
+        self.words.update(other.words)
+
+    def result(self):
+        return self.words
+
+
+@register_report("host_pages")
+class HostPagesReport(Aggregator):
+    """ Counter of the records per host (netloc). """
+    def __init__(self):
+        self.hosts = Counter()
+
+    def add(self, url, word_freqs):
+        self.hosts[url.split("/")[2]] += 1
+
+    def merge(self, other):
+        self.hosts.update(other.hosts)
+
+    def result(self):
+        return self.hosts
+
+
+@register_report("host_index")
+class HostIndexReport(Aggregator):
+    """ HostIndex of the archived urls, for per host and per subdomain page counts. """
+    def __init__(self):
+        from host_index import HostIndex
+        self.index = HostIndex()
+
+    def add(self, url, word_freqs):
+        self.index.add(url)
+
+    def merge(self, other):
+        self.index.merge(other.index)
+
+    def result(self):
+        return self.index
+
+
+class HeavyHitters(object):
+    """
+    Bounded memory word counts (weighted Space-Saving): at most 2 * capacity
+    words are tracked, when full only the capacity most frequent are kept.
+    A word that is not tracked may have been counted up to error times, so
+    a new word starts from error: every count is an overestimate by at most
+    error, and every word counted more than error times is tracked.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = dict()
+        self.error = 0
+
+    def update(self, word_freqs):
+        counts = self.counts
+        error = self.error
+        for word, count in word_freqs.items():
+            counts[word] = counts.get(word, error) + count
+        if len(counts) >= 2 * self.capacity:
+            self._prune()
+
+    def merge(self, other):
+        counts = {word: count + other.counts.get(word, other.error)
+                  for word, count in self.counts.items()}
+        for word, count in other.counts.items():
+            if word not in counts:
+                counts[word] = self.error + count
+        self.counts = counts
+        self.error += other.error
+        if len(counts) >= 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        ranked = sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        self.error = max(self.error, ranked[self.capacity][1])
+        self.counts = dict(ranked[:self.capacity])
+
+    def most_common(self, n=None) -> list:
+        """[(word, count)] by count, the counts are exact when error is 0."""
+        return sorted(self.counts.items(), key=itemgetter(1), reverse=True)[:n]
+
+
+@register_report("top_words")
+class TopWordsReport(Aggregator):
+    """
+    HeavyHitters of every word over every record, for archives whose
+    vocabulary does not fit in memory as common_words.
+    """
+    capacity = 10000
+
+    def __init__(self):
+        self.words = HeavyHitters(self.capacity)
+
+    def add(self, url, word_freqs):
+        self.words.update(word_freqs)
+
+    def merge(self, other):
+        self.words.merge(other.words)
+
+    def result(self):
+        return self.words
+
+
+def archive_records(archive_path):
+    """
+    Yields the (url, {word: count}) records of a json lines archive (with its
+    rotated parts), or of a tf_archive file (.tfa).
+    """
+    if archive_path.endswith(".tfa"):
+        from tf_archive import TermFrequencyArchive
+        archive = TermFrequencyArchive(archive_path)
+        try:
+            yield from archive
+        finally:
+            archive.close()
+        return
+    for part in archive_parts(archive_path):
+        with open(part, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield from json.loads(line).items()
+
+
+def archive_chunks(archive_path, chunks) -> list:
+    """
+    Splits the archive into about chunks pieces, in archive order: (path,
+    start, end) byte ranges of its json lines parts, each starting at a line
+    and ending after one, or (path, first page, end page) of a .tfa archive.
+    """
+    if archive_path.endswith(".tfa"):
+        from tf_archive import TermFrequencyArchive
+        archive = TermFrequencyArchive(archive_path)
+        pages = len(archive)
+        archive.close()
+        step = max(1, -(-pages // chunks))
+        return [(archive_path, start, min(start + step, pages)) for start in range(0, pages, step)]
+    parts = [(part, os.path.getsize(part)) for part in archive_parts(archive_path)]
+    step = max(1, -(-sum(size for _, size in parts) // chunks))
+    ranges = list()
+    for part, size in parts:
+        with open(part, "rb") as file:
+            start = 0
+            while start < size:
+                file.seek(min(start + step, size))
+                # Move the boundary to the start of the next line (readline at EOF reads nothing).
+                file.readline()
+                end = min(file.tell(), size)
+                ranges.append((part, start, end))
+                start = end
+    return ranges
+
+
+def chunk_records(chunk):
+    """ Yields the (url, {word: count}) records of a chunk of archive_chunks. """
+    path, start, end = chunk
+    if path.endswith(".tfa"):
+        from tf_archive import TermFrequencyArchive
+        archive = TermFrequencyArchive(path)
+        try:
+            for page in range(start, end):
+                yield archive.url(page), archive.word_freqs(page)
+        finally:
+            archive.close()
+        return
+    with open(path, "rb") as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            if line.strip():
+                yield from json.loads(line).items()
+
+
+def _aggregate_chunk(chunk, names) -> dict:
+    """ Map step of run_reports, run in the pool: {name: aggregator} of one chunk. """
+    aggregators = {name: get_report(name)() for name in names}
+    adders = [aggregator.add for aggregator in aggregators.values()]
+    for url, word_freqs in chunk_records(chunk):
+        for add in adders:
+            add(url, word_freqs)
+    return aggregators
+
+
+def _merge_tree(partials) -> dict:
+    """ Reduce step of run_reports: merges neighbouring partial results until one is left. """
+    while len(partials) > 1:
+        merged = list()
+        for left, right in zip(partials[::2], partials[1::2]):
+            for name, aggregator in left.items():
+                aggregator.merge(right[name])
+            merged.append(left)
+        if len(partials) % 2:
+            merged.append(partials[-1])
+        partials = merged
+    return partials[0]
+
+
+def aggregate(archive_path, names, processes=1) -> dict:
+    """ {name: aggregator} fed every record of the archive, see run_reports. """
+    if processes > 1:
+        # A few chunks per process, so that a slow chunk does not leave the others idle.
+        chunks = archive_chunks(archive_path, 4 * processes)
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(processes) as executor:
+                partials = list(executor.map(_aggregate_chunk, chunks, [names] * len(chunks)))
+            return _merge_tree(partials)
+    aggregators = {name: get_report(name)() for name in names}
+    adders = [aggregator.add for aggregator in aggregators.values()]
+    for url, word_freqs in archive_records(archive_path):
+        for add in adders:
+            add(url, word_freqs)
+    return aggregators
+
+
+def archive_signature(archive_path) -> tuple:
+    """ Changes whenever a file of the archive changes. """
+    paths = [archive_path] if archive_path.endswith(".tfa") else archive_parts(archive_path)
+    return tuple((path, os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths)
+
+
+def run_reports(archive_path, names, cache=True, processes=1) -> dict:
+    """
+    {name: result} of the named reports over the archive, computing the
+    ones not cached in a single pass over the archive, split over processes
+    processes (None = one per cpu).
+    """
+    cache_path = f"{archive_path}.analytics"
+    signature = archive_signature(archive_path)
+    results = dict()
+    if cache and os.path.exists(cache_path):
+        with open(cache_path, "rb") as file:
+            try:
+                cached_signature, cached_results = pickle.load(file)
+            except (pickle.UnpicklingError, EOFError, ValueError):
+                cached_signature, cached_results = None, dict()
+        if cached_signature == signature:
+            results = cached_results
+    missing = [name for name in dict.fromkeys(names) if name not in results]
+    if missing:
+        aggregators = aggregate(archive_path, missing, processes or os.cpu_count())
+        results.update((name, aggregator.result()) for name, aggregator in aggregators.items())
+        if cache:
+            temporary_path = f"{cache_path}.tmp"
+            with open(temporary_path, "wb") as file:
+                pickle.dump((signature, results), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+    return {name: results[name] for name in names}
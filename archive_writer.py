@@ -0,0 +1,97 @@
+import glob
+import json
+import os
+import time
+from queue import Queue, Empty
+from threading import Thread
+
+# Put on the queue by close(), the writer drains what is before it and stops.
+_CLOSE = object()
+
+
+def archive_parts(path) -> list:
+    """
+    The files of the archive at path in the order they were written: the
+    rotated parts (e.g. data.0001.json, data.0002.json), then path itself.
+    """
+    root, ext = os.path.splitext(path)
+    parts = sorted(glob.glob(f"{glob.escape(root)}.[0-9][0-9][0-9][0-9]{ext}"))
+    return parts + [path] if os.path.exists(path) else parts
+
+
+class ArchiveWriter(object):
+    """
+    Appends the json lines archive from a single background thread, so the
+    workers only put {url: word_freqs} records on a queue and move on, and
+    lines can not interleave. Records are serialized and written in batches
+    of flush_records, or of what was queued in flush_ms. Each batch is
+    flushed, and fsynced if fsync is set. Once the file reaches rotate_bytes
+    (0 = never) it is renamed to the next part (see archive_parts) and a new
+    file is started. close() writes every queued record before returning.
+    """
+    def __init__(self, path, flush_records=512, flush_ms=1000, fsync=False,
+                 rotate_bytes=0, max_queued=10000, logger=None):
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_seconds = flush_ms / 1000
+        self.fsync = fsync
+        self.rotate_bytes = rotate_bytes
+        self.logger = logger
+        self.queue = Queue(max_queued)
+        self.written = 0
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.file = open(path, "a", encoding="utf-8", buffering=1 << 20)
+        self.thread = Thread(target=self._run, name="ArchiveWriter", daemon=True)
+        self.thread.start()
+
+    def write(self, url, word_freqs):
+        """Queues the record of url, word_freqs must not be changed afterwards."""
+        self.queue.put((url, word_freqs))
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_CLOSE)
+            self.thread.join()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.flush_records and batch[-1] is not _CLOSE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except Empty:
+                    break
+            if batch[-1] is _CLOSE:
+                batch.pop()
+                closing = True
+            try:
+                self._write(batch)
+            except Exception:
+                # Keep draining the queue, or the workers block on put forever.
+                if self.logger:
+                    self.logger.exception(f"Failed to archive {len(batch)} records.")
+        self.file.close()
+
+    def _write(self, batch):
+        if batch:
+            self.file.write("".join(
+                json.dumps({url: word_freqs}, ensure_ascii=False) + "\n"
+                for url, word_freqs in batch))
+            self.written += len(batch)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        if self.rotate_bytes and self.file.tell() >= self.rotate_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        root, ext = os.path.splitext(self.path)
+        # The rotated parts and path, so the next part is number len(parts).
+        number = len(archive_parts(self.path))
+        os.replace(self.path, f"{root}.{number:04d}{ext}")
+        self.file = open(self.path, "a", encoding="utf-8", buffering=1 << 20)
@@ -0,0 +1,59 @@
+"""
+Compares the html extractors of html_extract: pages per second, peak
+python memory per page (tracemalloc, libxml2's own buffers are not
+counted), and whether they agree on tokens and links.
+
+    python -m benchmarks.bench_extract [--store Logs/responses.store] [--pages 200]
+"""
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import ctoken
+import html_extract
+from benchmarks.pages import load_pages
+
+
+def pages_per_second(extract, pages, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            extract(page)
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best
+
+
+def peak_memory_per_page(extract, pages) -> float:
+    peaks = list()
+    for page in pages:
+        tracemalloc.start()
+        extract(page)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main(store_path, page_count):
+    pages = load_pages(store_path, page_count)
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.1f} KiB on average")
+    print(f"{'extractor':<10}{'pages/sec':>12}{'KiB/page':>12}")
+    for name, extract in html_extract.EXTRACTORS.items():
+        print(f"{name:<10}{pages_per_second(extract, pages):>12.1f}"
+              f"{peak_memory_per_page(extract, pages) / 1024:>12.1f}")
+    same_tokens = same_links = 0
+    for page in pages:
+        lxml_text, lxml_links = html_extract.extract_lxml(page)
+        bs4_text, bs4_links = html_extract.extract_bs4(page)
+        same_tokens += ctoken.tokenize_page(lxml_text) == ctoken.tokenize_page(bs4_text)
+        same_links += lxml_links == bs4_links
+    print(f"same tokens on {same_tokens}/{len(pages)} pages, "
+          f"same links on {same_links}/{len(pages)} pages")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--store", type=str, default=None)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+    main(args.store, args.pages)
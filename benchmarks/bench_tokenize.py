@@ -0,0 +1,107 @@
+"""
+Times the tokenizer backends of tokenizers.py, and the ctoken loop that
+count_page replaced, to pick TOKENIZER by throughput: tokens per second on
+benchmarks/corpus.txt (or the text of recorded pages), after a first call
+that loads the backend's resources (timed separately). Also checks that
+ctoken's single pattern pass gives the same tokens as the loop with its
+split fix.
+
+    python -m benchmarks.bench_tokenize [--store Logs/responses.store] [--repeat 200]
+"""
+import os
+import re
+import time
+from argparse import ArgumentParser
+from collections import Counter
+
+import ctoken
+import html_extract
+import tokenizers
+from benchmarks.pages import recorded_pages
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus.txt")
+
+
+def loop_tokenize_line(line: str, ignore_stop_words: bool = False, split_parts: bool = False) -> list:
+    """
+    ctoken.tokenize_line before the single pattern pass. It appended the whole
+    word once per split part, split_parts appends the parts instead.
+    """
+    tokenlist = list()
+    for word in line.lower().translate(ctoken.TABLE2).split():
+        wordlist = re.split('/|-|&', word)
+        if len(wordlist) > 1:
+            for w in wordlist:
+                if w != "":
+                    try:
+                        tokenlist.append((w if split_parts else word).encode("ascii").decode())
+                    except UnicodeEncodeError:
+                        pass
+        else:
+            try:
+                tokenlist.append(word.encode("ascii").decode())
+            except UnicodeEncodeError:
+                pass
+    if ignore_stop_words:
+        tokenlist = [word for word in tokenlist if word not in ctoken.STOP_WORDS]
+    return tokenlist
+
+
+def loop_tokenize_page(page_text: str, ignore_stop_words: bool = False) -> list:
+    page_text = page_text.replace('\n', ' ').replace('\t', ' ').replace('/', ' ')
+    return loop_tokenize_line(page_text, ignore_stop_words)
+
+
+def loop_counts(page_text: str, ignore_stop_words: bool = False) -> Counter:
+    return Counter(loop_tokenize_page(page_text, ignore_stop_words))
+
+
+TOKENIZERS = {"ctoken loop": loop_counts, **tokenizers.TOKENIZERS}
+
+
+def tokens_per_second(tokenize, texts, token_count, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            tokenize(text, ignore_stop_words=True)
+        best = min(best, time.perf_counter() - start)
+    return token_count / best
+
+
+def main(store_path, repeat):
+    if store_path:
+        texts = [html_extract.extract_lxml(page)[0] for page in recorded_pages(store_path)]
+    else:
+        with open(CORPUS_PATH, encoding="utf-8") as file:
+            texts = [file.read()] * repeat
+    token_count = sum(len(ctoken.tokenize_page(text)) for text in texts)
+    print(f"{len(texts)} texts, {token_count} tokens (as counted by ctoken)")
+    print(f"{'tokenizer':<16}{'load ms':>10}{'tokens/sec':>14}")
+    throughput = dict()
+    for name, tokenize in TOKENIZERS.items():
+        start = time.perf_counter()
+        try:
+            tokenize(texts[0], ignore_stop_words=True)
+        except LookupError:
+            print(f"{name:<16}skipped, its resources are not installed")
+            continue
+        load_ms = (time.perf_counter() - start) * 1000
+        throughput[name] = tokens_per_second(tokenize, texts, token_count)
+        print(f"{name:<16}{load_ms:>10.1f}{throughput[name]:>14.0f}")
+    fastest = max((name for name in throughput if name in tokenizers.TOKENIZERS),
+                  key=throughput.get, default=None)
+    print(f"fastest TOKENIZER: {fastest}")
+    same = sum(
+        ctoken.tokenize_page(text, True) == loop_tokenize_line(text, True, split_parts=True)
+        and ctoken.count_page(text, True) == Counter(ctoken.tokenize_page(text, True))
+        for text in texts)
+    print(f"same tokens as the loop with split parts on {same}/{len(texts)} texts")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--store", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.store, args.repeat)
@@ -0,0 +1,47 @@
+"""
+Pages for the benchmarks: the html bodies recorded in a response store
+(RESPONSE_MODE = record), or synthetic pages when no store is given.
+"""
+import random
+
+WORDS = ("information computer science research students faculty school "
+         "program undergraduate graduate honors academic policies contact "
+         "resources support events news seminar data systems software "
+         "machine learning statistics informatics bren hall irvine uci "
+         "course schedule advising career award alumni lab project paper").split()
+
+
+def synthetic_page(rng, paragraphs=20, links=60) -> bytes:
+    nav = "".join(
+        f'<li><a href="/{rng.choice(WORDS)}/{rng.choice(WORDS)}-{i}.html">{rng.choice(WORDS)}</a></li>'
+        for i in range(links))
+    body = "".join(
+        "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + "</p>"
+        for _ in range(paragraphs))
+    return (f"<!DOCTYPE html><html><head><title>{rng.choice(WORDS)}</title>"
+            f"<style>p {{ margin: 0 }}</style><script>var x = '<a href=\"/no\">';</script>"
+            f"</head><body><ul>{nav}</ul><div>{body}</div>"
+            f"<!-- footer --><footer>&copy; uci &amp; ics</footer></body></html>").encode("utf-8")
+
+
+def synthetic_pages(count=200, seed=0) -> list:
+    rng = random.Random(seed)
+    return [synthetic_page(rng) for _ in range(count)]
+
+
+def recorded_pages(store_path, limit=None) -> list:
+    """Html bodies of the successful responses in a ResponseStore."""
+    from utils.download import to_response
+    from utils.response_store import ResponseStore
+    pages = list()
+    for status, payload in ResponseStore(store_path):
+        resp = to_response("", status, payload)
+        if resp.error is None and resp.status == 200 and resp.content:
+            pages.append(resp.content)
+            if limit and len(pages) >= limit:
+                break
+    return pages
+
+
+def load_pages(store_path=None, limit=None) -> list:
+    return recorded_pages(store_path, limit) if store_path else synthetic_pages(limit or 200)
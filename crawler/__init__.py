@@ -1,3 +1,4 @@
+import scraper
 from utils import get_logger
 from crawler.frontier import Frontier
 from crawler.worker import Worker
@@ -6,6 +7,7 @@ class Crawler(object):
     def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker):
         self.config = config
         self.logger = get_logger("CRAWLER")
+        scraper.configure(config, restart)
         self.frontier = frontier_factory(config, restart)
         self.workers = list()
         self.worker_factory = worker_factory
@@ -22,5 +24,13 @@ class Crawler(object):
         self.join()
 
     def join(self):
-        for worker in self.workers:
-            worker.join()
+        try:
+            for worker in self.workers:
+                worker.join()
+        finally:
+            # Also when stopped with Ctrl-C: pages already marked complete may
+            # still have archive records queued. The frontier is closed first,
+            # so no page is marked complete after the archive is drained.
+            if hasattr(self.frontier, "close"):
+                self.frontier.close()
+            scraper.close()
@@ -0,0 +1,112 @@
+import asyncio
+from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from utils.download import to_response, get_client
+from utils.response import Response
+from utils import get_logger
+from scraper import scraper, report_new_links
+
+
+class AsyncWorker(Thread):
+    '''
+    Worker that keeps up to config.async_concurrency downloads in flight on
+    one asyncio event loop instead of one blocking download per thread.
+    Downloaded responses are queued to config.async_parsers parse threads
+    that run the scraper and update the frontier. Per-host politeness is
+    still enforced by the frontier.
+    '''
+    def __init__(self, worker_id, config, frontier):
+        self.logger = get_logger(f"AsyncWorker-{worker_id}", "Worker")
+        self.config = config
+        self.frontier = frontier
+        super().__init__(daemon=True)
+
+    def run(self):
+        asyncio.run(self._crawl())
+
+    async def _crawl(self):
+        in_flight = asyncio.Semaphore(self.config.async_concurrency)
+        # Bounded, so downloads wait when parsing falls behind.
+        parse_queue = asyncio.Queue(maxsize=self.config.async_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.config.download_timeout)
+        connector = aiohttp.TCPConnector(limit=self.config.async_concurrency)
+        with ThreadPoolExecutor(self.config.async_parsers) as executor:
+            async with aiohttp.ClientSession(
+                    connector=connector, timeout=timeout) as session:
+                parsers = [
+                    asyncio.create_task(self._parse(parse_queue, executor))
+                    for _ in range(self.config.async_parsers)]
+                downloads = set()
+                loop = asyncio.get_running_loop()
+                while True:
+                    # In a thread, the frontier lock is held while it compacts,
+                    # which would stall every download in flight on this loop.
+                    tbd_url, wait = await loop.run_in_executor(None, self.frontier.poll_tbd_url)
+                    if tbd_url is None:
+                        if wait is None:
+                            break
+                        await asyncio.sleep(wait)
+                        continue
+                    await in_flight.acquire()
+                    download = asyncio.create_task(self._download(
+                        session, tbd_url, in_flight, parse_queue))
+                    downloads.add(download)
+                    download.add_done_callback(downloads.discard)
+                await asyncio.gather(*downloads)
+                await parse_queue.join()
+                for parser in parsers:
+                    parser.cancel()
+        self.logger.info("Frontier is empty. Stopping Crawler.")
+
+    async def _download(self, session, url, in_flight, parse_queue):
+        try:
+            try:
+                if self.config.response_mode == "replay":
+                    resp = get_client(self.config).replay(url, self.logger)
+                else:
+                    resp = await self._fetch(session, url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                self.logger.error(f"Failed to download {url}: {error!r}")
+                resp = Response({"error": repr(error), "status": 600, "url": url})
+            except Exception as error:
+                # Still queued, so that the url is marked complete.
+                self.logger.exception(f"Failed to download {url}.")
+                resp = Response({"error": repr(error), "status": 600, "url": url})
+            # Holds the download slot until the parsers have room.
+            await parse_queue.put((url, resp))
+        finally:
+            in_flight.release()
+
+    async def _fetch(self, session, url):
+        host, port = self.config.cache_server
+        async with session.get(
+                f"http://{host}:{port}/",
+                params=[("q", f"{url}"), ("u", f"{self.config.user_agent}")]) as resp:
+            content = await resp.read()
+            store = get_client(self.config).store
+            if store is not None:
+                store.append(url, resp.status, content)
+            return to_response(url, resp.status, content, self.logger)
+
+    async def _parse(self, parse_queue, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            url, resp = await parse_queue.get()
+            try:
+                await loop.run_in_executor(executor, self._process, url, resp)
+            except Exception:
+                self.logger.exception(f"Failed to process {url}.")
+                self.frontier.mark_url_complete(url)
+            finally:
+                parse_queue.task_done()
+
+    def _process(self, tbd_url, resp):
+        self.logger.info(f"#{self.frontier.discovered} - {tbd_url}")
+        scraped_urls = scraper(tbd_url, resp)
+        new_urls = [scraped_url for scraped_url in scraped_urls
+                    if self.frontier.add_url(scraped_url, parent_links=len(scraped_urls))]
+        report_new_links(tbd_url, new_urls)
+        self.frontier.mark_url_complete(tbd_url)
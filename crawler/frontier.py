@@ -1,17 +1,48 @@
 import os
+import pickle
 import shelve
 
-from threading import Thread, RLock
+from threading import Thread, RLock, Condition
 from queue import Queue, Empty
+from collections import Counter
 
 from utils import get_logger, get_urlhash, normalize
 from scraper import is_valid
+from crawler.scheduler import HostScheduler, PriorityHostScheduler, get_host
+from crawler.journal import FrontierJournal
+from crawler.spill import SpillQueue, PrioritySpillQueue, format_entry, parse_entry
+from crawler.priority import get_scorer
+from crawler.seen import url_fingerprint, make_seen_set, BloomFilter
 
 class Frontier(object):
     def __init__(self, config, restart):
         self.logger = get_logger("FRONTIER")
         self.config = config
-        self.to_be_downloaded = list()
+        self.lock = RLock()
+        self.has_work = Condition(self.lock)
+        # Urls waiting for their host's politeness window. In priority order
+        # the best scored url of a ready host is handed out first, otherwise
+        # the newest one.
+        self.scorer = None
+        if self.config.frontier_order == "priority":
+            self.scorer = get_scorer(self.config.priority_scorer)
+            self.to_be_downloaded = PriorityHostScheduler(self.config.time_delay)
+        else:
+            self.to_be_downloaded = HostScheduler(self.config.time_delay)
+        # Number of urls discovered per host, for scorers.
+        self.host_counts = Counter()
+        # Urls beyond the in-memory budget, refilled into to_be_downloaded
+        # in batches as it drains. In priority order the lowest scored urls
+        # are spilled, and refilled best bucket first.
+        spill_queue = PrioritySpillQueue if self.scorer is not None else SpillQueue
+        self.spilled = spill_queue(
+            self.config.spill_dir, self.config.spill_segment_urls)
+        # Best score spilled since the spill queue was last empty, urls not
+        # scored above it are spilled rather than making room in memory.
+        self.spill_floor = None
+        # Urls handed to a worker but not marked complete yet, with their
+        # score. While there are any, an empty frontier may still get new urls.
+        self.in_progress = dict()
         
         if not os.path.exists(self.config.save_file) and not restart:
             # Save file does not exist, but request to load save.
@@ -23,50 +54,319 @@ class Frontier(object):
             self.logger.info(
                 f"Found save file {self.config.save_file}, deleting it.")
             os.remove(self.config.save_file)
+        if restart:
+            for file in (self.config.journal_file, self.config.pending_file,
+                         self.config.seen_file):
+                if os.path.exists(file):
+                    os.remove(file)
         # Load existing save file, or create one if it does not exist.
+        # The shelve is only a snapshot, updates go to the journal first and
+        # are folded into the shelve by _compact.
         self.save = shelve.open(self.config.save_file)
-        if restart:
+        # Updates since the last compaction, {urlhash: (url, completed)}.
+        self.recent = dict()
+        # True while the pending snapshot is still being read in the background.
+        self.loading = False
+        if (not restart and os.path.exists(self.config.pending_file)
+                and os.path.exists(self.config.seen_file)):
+            # Resume from the snapshots written by the last compaction, which
+            # only needs the pending urls and not the whole shelve.
+            self._resume_from_snapshots()
+        else:
+            # In-memory membership of every url ever added, so that repeated
+            # urls are rejected without touching the shelve.
+            self.seen = make_seen_set(self.config)
+            self._recover_journal()
+            for urlhash in self.save.keys():
+                self.seen.add(url_fingerprint(urlhash))
+            if not restart:
+                # Set the frontier state with contents of save file.
+                self._parse_save_file()
+        self.journal = FrontierJournal(
+            self.config.journal_file,
+            self.config.journal_flush_records, self.config.journal_flush_ms)
+        self.discovered = len(self.seen)
+        if restart or not self.discovered:
             for url in self.config.seed_urls:
                 self.add_url(url)
+
+    def _recover_journal(self, count_hosts=False):
+        '''
+        Replays the committed journal records of a previous run into the
+        snapshot. Returns the replayed records. With count_hosts the urls
+        not in the seen set yet are added to host_counts.
+        '''
+        records = list(FrontierJournal.read(self.config.journal_file))
+        for urlhash, url, completed, _ in records:
+            self.save[urlhash] = (url, completed)
+            if self.seen.add(url_fingerprint(urlhash)) and count_hosts:
+                self.host_counts[get_host(url)] += 1
+        if records:
+            self.save.sync()
+            self.logger.info(f"Replayed {len(records)} journal records.")
+        return records
+
+    def _resume_from_snapshots(self):
+        with open(self.config.seen_file, "rb") as file:
+            self.seen = pickle.load(file)
+            try:
+                host_counts = pickle.load(file)
+            except EOFError:
+                # Written before the host counts were kept with the seen set.
+                host_counts = None
+        if (self.config.seen_set == "bloom") != isinstance(self.seen, BloomFilter):
+            # SEEN_SET changed since the snapshot was written.
+            self.seen = make_seen_set(self.config)
+            for urlhash in self.save.keys():
+                self.seen.add(url_fingerprint(urlhash))
+        if host_counts is not None:
+            self.host_counts = host_counts
+        # Urls completed after the snapshot must not be queued again.
+        completed_since = set()
+        added_since = dict()
+        for urlhash, url, completed, score in self._recover_journal(host_counts is not None):
+            if completed:
+                completed_since.add(url)
+                added_since.pop(url, None)
+            else:
+                # Added or reprioritized after the snapshot.
+                added_since[url] = score
+        if host_counts is None:
+            for url, _ in self.save.values():
+                self.host_counts[get_host(url)] += 1
+        for url, score in added_since.items():
+            if is_valid(url):
+                self._enqueue(url, score)
+        skip = completed_since.union(added_since)
+        if self.config.lazy_resume:
+            self.loading = True
+            Thread(
+                target=self._load_pending, args=(skip,),
+                daemon=True).start()
         else:
-            # Set the frontier state with contents of save file.
-            self._parse_save_file()
-            if not self.save:
-                for url in self.config.seed_urls:
-                    self.add_url(url)
+            self._load_pending(skip)
+
+    def _load_pending(self, skip, batch_size=10000):
+        ''' Queues the urls of the pending snapshot, in batches so workers can start meanwhile. '''
+        tbd_count = 0
+        with open(self.config.pending_file, "r", encoding="utf-8") as file:
+            while True:
+                batch = [parse_entry(line) for _, line in zip(range(batch_size), file)]
+                if not batch:
+                    break
+                with self.has_work:
+                    for url, score in batch:
+                        if url not in skip and is_valid(url):
+                            self._enqueue(url, score)
+                            tbd_count += 1
+                    self.has_work.notify_all()
+        with self.has_work:
+            self.loading = False
+            self.has_work.notify_all()
+        self.logger.info(
+            f"Found {tbd_count} urls to be downloaded in the pending snapshot.")
+
+    def _pending_urls(self):
+        ''' Yields (url, score) of every url not downloaded yet. '''
+        yield from self.in_progress.items()
+        yield from self.to_be_downloaded.items()
+        yield from self.spilled
+
+    def _enqueue(self, url, score=None):
+        budget = self.config.frontier_memory_urls
+        if not budget or len(self.to_be_downloaded) < budget:
+            self.to_be_downloaded.push(url, score)
+        elif self.scorer is None:
+            self.spilled.push(url, score)
+        else:
+            # Unscored urls (e.g. resumed from a lifo crawl) rank as 0, as in the scheduler.
+            score = score or 0
+            if self.spill_floor is None or score > self.spill_floor:
+                # Make room by spilling the lowest scored tenth of the budget.
+                for evicted_url, evicted_score in self.to_be_downloaded.evict(max(1, budget // 10)):
+                    self._spill(evicted_url, evicted_score)
+            if score > self.spill_floor:
+                self.to_be_downloaded.push(url, score)
+            else:
+                self._spill(url, score)
+
+    def _spill(self, url, score):
+        self.spilled.push(url, score)
+        if self.scorer is not None and (self.spill_floor is None or score > self.spill_floor):
+            self.spill_floor = score
+
+    def _refill(self):
+        ''' Moves spilled urls back into memory once it is below half of the budget. '''
+        budget = self.config.frontier_memory_urls
+        if self.spilled and len(self.to_be_downloaded) <= budget // 2:
+            for url, score in self.spilled.pop_batch(budget - len(self.to_be_downloaded)):
+                self.to_be_downloaded.push(url, score)
+            if not self.spilled:
+                self.spill_floor = None
+
+    def _write_snapshots(self):
+        '''
+        Atomically replaces the pending url snapshot and the seen set
+        snapshot, which also holds host_counts.
+        '''
+        tmp_file = f"{self.config.pending_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            for url, score in self._pending_urls():
+                file.write(format_entry(url, score) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_file, self.config.pending_file)
+        tmp_file = f"{self.config.seen_file}.tmp"
+        with open(tmp_file, "wb") as file:
+            pickle.dump(self.seen, file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(self.host_counts, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_file, self.config.seen_file)
+
+    def _compact(self):
+        '''
+        Folds the journaled updates into the shelve snapshot, writes the
+        pending url and seen set snapshots and empties the journal.
+        '''
+        if self.loading:
+            # The pending snapshot is still being read, it cannot be replaced yet.
+            return
+        self.journal.commit()
+        for urlhash, record in self.recent.items():
+            self.save[urlhash] = record
+        self.save.sync()
+        self._write_snapshots()
+        self.journal.truncate()
+        self.recent.clear()
+        self.logger.info(
+            f"Compacted frontier: {len(self.seen)} urls seen, seen set uses "
+            f"{self.seen.memory_bytes() / 2 ** 20:.1f} MiB with a false "
+            f"positive rate of {self.seen.false_positive_rate():.2e}.")
+
+    def _record(self, urlhash, url, completed, score=None):
+        self.recent[urlhash] = (url, completed)
+        self.journal.append(urlhash, url, completed, score)
+        if len(self.recent) >= self.config.journal_compact_records:
+            self._compact()
 
     def _parse_save_file(self):
         ''' This function can be overridden for alternate saving techniques. '''
         total_count = len(self.save)
         tbd_count = 0
         for url, completed in self.save.values():
+            self.host_counts[get_host(url)] += 1
             if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
+                self._enqueue(url, self._score(url))
                 tbd_count += 1
         self.logger.info(
             f"Found {tbd_count} urls to be downloaded from {total_count} "
             f"total urls discovered.")
 
+    def is_idle(self):
+        ''' True if no url is queued, in progress or still to be loaded. '''
+        with self.lock:
+            return not (self.to_be_downloaded or self.spilled
+                        or self.in_progress or self.loading)
+
+    def _pop(self):
+        ''' Returns (url, wait) as in HostScheduler.pop, keeps the url's score in in_progress. '''
+        self._refill()
+        url, score, wait = self.to_be_downloaded.pop()
+        if url is not None:
+            self.in_progress[url] = score
+        return url, wait
+
+    def _is_done(self):
+        # Nothing queued and nothing that could add more.
+        return not self.in_progress and not self.loading
+
     def get_tbd_url(self):
-        try:
-            return self.to_be_downloaded.pop()
-        except IndexError:
+        ''' Blocks until some host is ready. Returns None when the crawl is done. '''
+        with self.has_work:
+            while True:
+                url, wait = self._pop()
+                if url is not None:
+                    return url
+                if wait is None and self._is_done():
+                    self.has_work.notify_all()
+                    return None
+                self.has_work.wait(wait)
+
+    def poll_tbd_url(self, poll_delay=0.1):
+        '''
+        Non-blocking get_tbd_url. Returns (url, 0), (None, seconds to wait
+        before polling again), or (None, None) when the crawl is done.
+        '''
+        with self.has_work:
+            url, wait = self._pop()
+            if url is None and wait is None and not self._is_done():
+                # Only urls in progress or loading could add more.
+                wait = poll_delay
+            return url, wait
+
+    def _score(self, url, parent_links=0):
+        if self.scorer is None:
             return None
+        return self.scorer(url, self, parent_links)
 
-    def add_url(self, url):
+    def add_url(self, url, parent_links=0):
+        '''
+        Queues url if it was not seen before, returns whether it was new.
+        parent_links is the number of links scraped from the page url was
+        found on, used by scorers.
+        '''
         url = normalize(url)
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            self.save[urlhash] = (url, False)
-            self.save.sync()
-            self.to_be_downloaded.append(url)
+        with self.has_work:
+            if self.seen.add(url_fingerprint(urlhash)):
+                self.host_counts[get_host(url)] += 1
+                score = self._score(url, parent_links)
+                # Queue before recording, the record may trigger a compaction
+                # that snapshots the pending urls.
+                self._enqueue(url, score)
+                self.discovered += 1
+                self._record(urlhash, url, False, score)
+                self.has_work.notify()
+                return True
+            if self.scorer is not None:
+                # Seen again from another page, which may rank it higher.
+                score = self._score(url, parent_links)
+                entry = self.to_be_downloaded.entries.get(url)
+                if entry is not None and score > -entry[0]:
+                    self.reprioritize(url, score)
+            return False
+
+    def reprioritize(self, url, score):
+        '''
+        Changes the score of a url queued in memory. Returns False if it is
+        not, e.g. because it was spilled (as one of the lowest scored) or
+        already handed out.
+        '''
+        url = normalize(url)
+        with self.has_work:
+            if self.scorer is None or not self.to_be_downloaded.reprioritize(url, score):
+                return False
+            self._record(get_urlhash(url), url, False, score)
+            return True
     
     def mark_url_complete(self, url):
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Completed url {url}, but have not seen it before.")
+        with self.has_work:
+            if url_fingerprint(urlhash) not in self.seen:
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
 
-        self.save[urlhash] = (url, True)
-        self.save.sync()
+            if url in self.in_progress:
+                del self.in_progress[url]
+                self.to_be_downloaded.release(url)
+            self._record(urlhash, url, True)
+            self.has_work.notify_all()
+
+    def close(self):
+        ''' Commits the journal and writes a final snapshot. '''
+        with self.lock:
+            self._compact()
+            self.journal.close()
+            self.save.close()
@@ -0,0 +1,82 @@
+import os
+import json
+
+from threading import Thread, Lock, Event
+
+
+class FrontierJournal(object):
+    '''
+    Append-only log of frontier updates. Records are buffered and committed
+    (flushed and fsynced) as a group every flush_records records or every
+    flush_ms milliseconds, whichever comes first. A crash loses at most the
+    batch that was not committed yet.
+    '''
+    def __init__(self, path, flush_records=256, flush_ms=1000):
+        self.path = path
+        self.flush_records = max(1, flush_records)
+        self.flush_ms = flush_ms
+        self.lock = Lock()
+        self.file = open(path, "a", encoding="utf-8")
+        self.uncommitted = 0
+        self.closed = Event()
+        self.flusher = None
+        if flush_ms > 0:
+            self.flusher = Thread(target=self._flush_periodically, daemon=True)
+            self.flusher.start()
+
+    @staticmethod
+    def read(path):
+        ''' Yields the committed (urlhash, url, completed, score) records of a journal. '''
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.endswith("\n"):
+                    # Torn write of the last, uncommitted batch.
+                    break
+                try:
+                    urlhash, url, completed, *score = json.loads(line)
+                except ValueError:
+                    break
+                yield urlhash, url, completed, score[0] if score else None
+
+    def append(self, urlhash, url, completed, score=None):
+        record = [urlhash, url, completed]
+        if score is not None:
+            record.append(score)
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.uncommitted += 1
+            if self.uncommitted >= self.flush_records:
+                self._commit()
+
+    def commit(self):
+        with self.lock:
+            self._commit()
+
+    def truncate(self):
+        ''' Drops all records, call once they are safely in the snapshot. '''
+        with self.lock:
+            self._commit()
+            self.file.seek(0)
+            self.file.truncate()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.closed.set()
+        with self.lock:
+            self._commit()
+            self.file.close()
+
+    def _commit(self):
+        if self.uncommitted:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.uncommitted = 0
+
+    def _flush_periodically(self):
+        while not self.closed.wait(self.flush_ms / 1000):
+            with self.lock:
+                if not self.file.closed:
+                    self._commit()
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+from threading import Thread, Lock, BoundedSemaphore
+
+from utils.download import download
+from utils import get_logger
+import scraper
+
+_pipelines = dict()
+_pipelines_lock = Lock()
+
+
+def get_pipeline(config, frontier):
+    ''' Returns the ParsePipeline shared by the workers of frontier. '''
+    with _pipelines_lock:
+        if id(frontier) not in _pipelines:
+            _pipelines[id(frontier)] = ParsePipeline(config, frontier)
+        return _pipelines[id(frontier)]
+
+
+class ParsePipeline(object):
+    '''
+    Parse stage shared by the PipelineWorkers of a crawler: pages are parsed
+    (scraper.parse_page) by config.parse_processes processes, so parsing
+    uses every core instead of holding the GIL of the fetch threads. The
+    parsed pages are finished (scraper.finish_page, frontier updates) by one
+    thread of this process, where the scraper's state lives. At most
+    config.parse_queue pages are parsing or waiting to be parsed or
+    finished, fetch threads wait for a free slot so that fetching cannot
+    outrun parsing.
+    '''
+    def __init__(self, config, frontier):
+        self.logger = get_logger("PIPELINE", "Worker")
+        self.frontier = frontier
+        # Spawned, forking a process with running threads is unsafe.
+        self.executor = ProcessPoolExecutor(
+            config.parse_processes or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=scraper.configure_parser, initargs=(config,))
+        self.slots = BoundedSemaphore(config.parse_queue)
+        self.parsed = Queue()
+        self.lock = Lock()
+        self.workers = 0
+        Thread(target=self._finish, daemon=True).start()
+
+    def attach(self):
+        with self.lock:
+            self.workers += 1
+
+    def detach(self):
+        ''' Called by each worker when it stops, the last one shuts the processes down. '''
+        with self.lock:
+            self.workers -= 1
+            if self.workers == 0:
+                self.executor.shutdown()
+
+    def submit(self, url, resp):
+        ''' Raises if url could not be handed to the parse stage, it is then not completed. '''
+        content = scraper.prepare_page(url, resp)
+        if content is None:
+            self._complete(url, scraper.finish_page(url, None, ()))
+            return
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(
+                scraper.parse_page, url, resp.url, content, resp.encoding)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.parsed.put((url, future)))
+
+    def _finish(self):
+        while True:
+            url, future = self.parsed.get()
+            self.slots.release()
+            try:
+                self._complete(url, scraper.finish_page(url, *future.result()))
+            except Exception:
+                # The url must still be completed, or the workers wait for it forever.
+                self.logger.exception(f"Failed to parse {url}.")
+                self.frontier.mark_url_complete(url)
+
+    def _complete(self, url, scraped_urls):
+        new_urls = [scraped_url for scraped_url in scraped_urls
+                    if self.frontier.add_url(scraped_url, parent_links=len(scraped_urls))]
+        scraper.report_new_links(url, new_urls)
+        self.frontier.mark_url_complete(url)
+
+
+class PipelineWorker(Thread):
+    '''
+    Fetch thread of the pipeline mode: downloads and hands the responses to
+    the crawler's ParsePipeline instead of parsing them itself.
+    '''
+    def __init__(self, worker_id, config, frontier):
+        self.logger = get_logger(f"Worker-{worker_id}", "Worker")
+        self.config = config
+        self.frontier = frontier
+        self.pipeline = get_pipeline(config, frontier)
+        self.pipeline.attach()
+        super().__init__(daemon=True)
+
+    def run(self):
+        try:
+            while True:
+                tbd_url = self.frontier.get_tbd_url()
+                if not tbd_url:
+                    self.logger.info("Frontier is empty. Stopping Crawler.")
+                    break
+                try:
+                    resp = download(tbd_url, self.config, self.logger)
+                    self.logger.info(f"#{self.frontier.discovered} - {tbd_url}")
+                    self.pipeline.submit(tbd_url, resp)
+                except Exception:
+                    self.logger.exception(f"Failed to crawl {tbd_url}.")
+                    self.frontier.mark_url_complete(tbd_url)
+        finally:
+            self.pipeline.detach()
@@ -0,0 +1,51 @@
+import math
+
+from crawler.scheduler import get_host
+from url_filter import url_blocks
+
+# Url scoring functions for the priority frontier, by PRIORITY_SCORER name.
+# A scorer is called as scorer(url, frontier, parent_links) where
+# parent_links is the number of links scraped from the page the url was
+# found on (0 for seeds and resumed urls). Higher scores are crawled first.
+SCORERS = dict()
+
+
+def register_scorer(name):
+    def register(scorer):
+        SCORERS[name] = scorer
+        return scorer
+    return register
+
+
+def get_scorer(name):
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown PRIORITY_SCORER {name}, "
+            f"expected one of {', '.join(sorted(SCORERS))}.")
+
+
+@register_scorer("depth")
+def depth_score(url, frontier, parent_links):
+    ''' Shallow urls first, deep paths are where most traps are. '''
+    return -url_blocks(url)
+
+
+@register_scorer("novelty")
+def host_novelty_score(url, frontier, parent_links):
+    ''' Urls of hosts with few discovered urls first. '''
+    return -frontier.host_counts[get_host(url)]
+
+
+@register_scorer("yield")
+def parent_yield_score(url, frontier, parent_links):
+    ''' Urls found on pages with many links first. '''
+    return parent_links
+
+
+@register_scorer("balanced")
+def balanced_score(url, frontier, parent_links):
+    return (depth_score(url, frontier, parent_links)
+            + math.log1p(parent_links)
+            - math.log1p(frontier.host_counts[get_host(url)]))
@@ -0,0 +1,205 @@
+import time
+import heapq
+import itertools
+from collections import deque
+from urllib.parse import urlparse
+
+
+def get_host(url):
+    return urlparse(url).netloc.lower()
+
+
+class HostScheduler(object):
+    '''
+    Keeps one queue of urls per host and a heap of the time each host may be
+    fetched again, so a url is only handed out once its host's politeness
+    window has expired. With a time_delay a host has at most one url in
+    flight: it is busy from pop until release, and its window starts when
+    the url is released, however long the download took.
+    Not thread safe, the Frontier holds its lock around it.
+    '''
+    def __init__(self, time_delay):
+        self.time_delay = time_delay
+        self.queues = dict()        # host -> deque of urls
+        self.next_fetch = dict()    # host -> earliest time of the next fetch
+        self.host_heap = list()     # (next fetch time, host) of idle hosts with urls
+        self.busy = set()           # hosts with a url handed out and not released
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for queue in self.queues.values():
+            yield from queue
+
+    def items(self):
+        ''' Yields (url, score) of every queued url, scores are not kept here. '''
+        for url in self:
+            yield url, None
+
+    def push(self, url, score=None):
+        host = get_host(url)
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = deque()
+            if host not in self.busy:
+                heapq.heappush(
+                    self.host_heap, (self.next_fetch.get(host, 0), host))
+        queue.append(url)
+        self.size += 1
+
+    def pop(self):
+        '''
+        Returns (url, score, 0) if some host is ready, (None, None, wait)
+        with the seconds until the next host is ready, or (None, None, None)
+        if nothing is queued but for busy hosts.
+        '''
+        if not self.host_heap:
+            return None, None, None
+        now = time.monotonic()
+        ready_at, host = self.host_heap[0]
+        if ready_at > now:
+            return None, None, ready_at - now
+        heapq.heappop(self.host_heap)
+        queue = self.queues[host]
+        url = queue.pop()
+        self.size -= 1
+        self._hand_out(host, queue, now)
+        return url, None, 0
+
+    def _hand_out(self, host, queue, now):
+        if self.time_delay:
+            # Queued again by release.
+            self.busy.add(host)
+        elif queue:
+            heapq.heappush(self.host_heap, (now, host))
+        if not queue:
+            del self.queues[host]
+
+    def release(self, url):
+        '''
+        Marks the url handed out by pop as downloaded, its host is ready
+        again time_delay seconds later.
+        '''
+        host = get_host(url)
+        if host not in self.busy:
+            return
+        self.busy.discard(host)
+        self.next_fetch[host] = time.monotonic() + self.time_delay
+        if host in self.queues:
+            heapq.heappush(self.host_heap, (self.next_fetch[host], host))
+
+
+class PriorityHostScheduler(HostScheduler):
+    '''
+    HostScheduler that hands out the best scored url of the best scored ready
+    host instead of the newest url of the first ready host. Higher scores are
+    downloaded first. Hosts whose politeness window expired move from
+    host_heap to ready_heap, keyed by their best url. Entries made stale by
+    reprioritize stay in the heaps and are skipped when they come up.
+    '''
+    def __init__(self, time_delay):
+        super().__init__(time_delay)
+        self.entries = dict()       # url -> [-score, order, url, host]
+        self.ready_heap = list()    # (-best score, order of best url, host)
+        self.ready_hosts = set()
+        self.order = itertools.count()
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def items(self):
+        for negated_score, _, url, _ in self.entries.values():
+            yield url, -negated_score
+
+    def push(self, url, score=None):
+        if url in self.entries:
+            self.reprioritize(url, score)
+            return
+        host = get_host(url)
+        entry = [-(score or 0), next(self.order), url, host]
+        self.entries[url] = entry
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = list()
+            if host not in self.busy:
+                heapq.heappush(
+                    self.host_heap, (self.next_fetch.get(host, 0), host))
+        heapq.heappush(queue, entry)
+        self.size += 1
+        if host in self.ready_hosts:
+            self._push_ready(host)
+
+    def reprioritize(self, url, score):
+        ''' Changes the score of a queued url, returns False if it is not queued. '''
+        entry = self.entries.pop(url, None)
+        if entry is None:
+            return False
+        # Mark the old entry as removed, it is dropped once at the top.
+        entry[2] = None
+        self.size -= 1
+        self.push(url, score)
+        return True
+
+    def evict(self, count):
+        '''
+        Removes the count lowest scored urls (the newest first among equal
+        scores), returns their (url, score) in that order.
+        '''
+        evicted = list()
+        hosts = set()
+        for entry in heapq.nlargest(count, self.entries.values()):
+            negated_score, _, url, host = entry
+            del self.entries[url]
+            # Marked as removed like in reprioritize.
+            entry[2] = None
+            evicted.append((url, -negated_score))
+            hosts.add(host)
+        self.size -= len(evicted)
+        for host in hosts:
+            queue = self.queues[host]
+            self._drop_removed(queue)
+            if not queue:
+                del self.queues[host]
+                self.ready_hosts.discard(host)
+        return evicted
+
+    def pop(self):
+        now = time.monotonic()
+        while self.host_heap and self.host_heap[0][0] <= now:
+            _, host = heapq.heappop(self.host_heap)
+            if host not in self.queues or host in self.busy:
+                # Every url of the host was evicted, the entry is stale.
+                continue
+            self.ready_hosts.add(host)
+            self._push_ready(host)
+        while self.ready_heap:
+            _, order, host = heapq.heappop(self.ready_heap)
+            if host not in self.ready_hosts:
+                continue
+            queue = self.queues[host]
+            self._drop_removed(queue)
+            if queue[0][1] != order:
+                # The host's best url changed since this entry was pushed.
+                continue
+            negated_score, _, url, _ = heapq.heappop(queue)
+            del self.entries[url]
+            self.size -= 1
+            self.ready_hosts.discard(host)
+            self._drop_removed(queue)
+            self._hand_out(host, queue, now)
+            return url, -negated_score, 0
+        if self.host_heap:
+            return None, None, self.host_heap[0][0] - now
+        return None, None, None
+
+    def _drop_removed(self, queue):
+        while queue and queue[0][2] is None:
+            heapq.heappop(queue)
+
+    def _push_ready(self, host):
+        queue = self.queues[host]
+        self._drop_removed(queue)
+        negated_score, order, _, _ = queue[0]
+        heapq.heappush(self.ready_heap, (negated_score, order, host))
@@ -0,0 +1,59 @@
+import math
+
+from utils import url_fingerprint
+from utils.fingerprints import FingerprintSet
+
+
+class BloomFilter(object):
+    '''
+    Bloom filter over 64-bit url fingerprints for crawls too large for
+    FingerprintSet. A false positive makes the frontier skip a new url, at
+    about error_rate once capacity urls are stored.
+    '''
+    def __init__(self, capacity=1 << 20, error_rate=0.001):
+        self.size = max(64, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, fingerprint):
+        # Double hashing on the two halves of the fingerprint.
+        low, high = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        for i in range(self.hash_count):
+            yield (low + i * high) % self.size
+
+    def __contains__(self, fingerprint):
+        bits = self.bits
+        return all(
+            bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(fingerprint))
+
+    def add(self, fingerprint):
+        ''' Adds the fingerprint, returns False if it (probably) was already present. '''
+        bits = self.bits
+        new = False
+        for pos in self._positions(fingerprint):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def memory_bytes(self):
+        return len(self.bits)
+
+    def false_positive_rate(self):
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) \
+            ** self.hash_count
+
+
+def make_seen_set(config):
+    if config.seen_set == "bloom":
+        return BloomFilter(config.seen_set_capacity, config.bloom_error_rate)
+    return FingerprintSet(config.seen_set_capacity)
@@ -0,0 +1,201 @@
+import os
+import copy
+import time
+import zlib
+import multiprocessing
+
+from threading import Thread
+
+from utils import get_logger, get_urlhash, normalize
+from crawler import Crawler
+from crawler.frontier import Frontier
+from crawler.journal import FrontierJournal
+from crawler.worker import Worker
+from crawler.scheduler import get_host
+from crawler.seen import FingerprintSet, url_fingerprint
+
+
+def shard_of(url, shard_count):
+    ''' Shard owning the url's host. Stable across processes, unlike hash(). '''
+    return zlib.crc32(get_host(url).encode("utf-8")) % shard_count
+
+
+def shard_path(path, shard_id):
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard_id}{ext}"
+
+
+def shard_config(config, shard_id, shard_count):
+    ''' Copy of config with the shard's own files and seed urls. '''
+    config = copy.copy(config)
+    for name in ("save_file", "journal_file", "pending_file", "seen_file",
+                 "spill_dir", "archive_file", "near_duplicates_file",
+                 "checksums_file", "aliases_file"):
+        setattr(config, name, shard_path(getattr(config, name), shard_id))
+    if config.response_mode == "record":
+        # Replay only reads the store, which is keyed by url, so a store recorded
+        # with any number of processes can be shared by all of them.
+        config.response_store = shard_path(config.response_store, shard_id)
+    config.outbox_file = f"{config.save_file}.outbox"
+    config.seed_urls = [
+        url for url in config.seed_urls
+        if shard_of(url, shard_count) == shard_id]
+    return config
+
+
+class ShardRouter(object):
+    '''
+    Shared state of the shard processes: one inbox per shard for urls found
+    by another shard, the number of routed urls not added yet, and which
+    shards are idle. The crawl is done once every shard is idle and no url
+    is in flight.
+    '''
+    def __init__(self, shard_count):
+        self.shard_count = shard_count
+        self.inboxes = [multiprocessing.Queue() for _ in range(shard_count)]
+        self.lock = multiprocessing.Lock()
+        self.in_flight = multiprocessing.Value("i", 0, lock=False)
+        self.idle = multiprocessing.Array("b", shard_count, lock=False)
+
+    def send(self, shard_id, url, parent_links):
+        with self.lock:
+            self.in_flight.value += 1
+        self.inboxes[shard_id].put((url, parent_links))
+
+    def received(self, shard_id):
+        with self.lock:
+            self.idle[shard_id] = False
+            self.in_flight.value -= 1
+
+    def is_done(self, shard_id, is_idle):
+        '''
+        is_idle is called under the lock, so a url received meanwhile is
+        either counted in flight or already makes the shard busy.
+        '''
+        with self.lock:
+            self.idle[shard_id] = is_idle()
+            return self.in_flight.value == 0 and all(self.idle)
+
+
+class ShardFrontier(object):
+    '''
+    Wraps the frontier of one shard. Urls of hosts owned by other shards are
+    routed to their inbox instead of being added, and get_tbd_url only
+    returns None once all shards are done.
+    Routed urls are journaled in outbox_file before they are sent, and the
+    whole outbox is sent again on a resume: a url lost in an inbox by an
+    interrupt is then added by its owner, the others are already seen there.
+    '''
+    def __init__(self, frontier, shard_id, router, outbox_file, restart=False,
+                 poll_delay=0.1):
+        self.frontier = frontier
+        self.shard_id = shard_id
+        self.router = router
+        self.poll_delay = poll_delay
+        # Urls already routed to another shard, so that they are sent once.
+        self.routed = FingerprintSet()
+        if restart and os.path.exists(outbox_file):
+            os.remove(outbox_file)
+        for urlhash, url, _, parent_links in FrontierJournal.read(outbox_file):
+            if self.routed.add(url_fingerprint(urlhash)):
+                self.router.send(shard_of(url, router.shard_count), url, parent_links or 0)
+        self.outbox = FrontierJournal(
+            outbox_file, frontier.config.journal_flush_records,
+            frontier.config.journal_flush_ms)
+        Thread(target=self._receive, daemon=True).start()
+
+    def __getattr__(self, name):
+        return getattr(self.frontier, name)
+
+    def _receive(self):
+        inbox = self.router.inboxes[self.shard_id]
+        while True:
+            url, parent_links = inbox.get()
+            self.frontier.add_url(url, parent_links=parent_links)
+            self.router.received(self.shard_id)
+
+    def get_tbd_url(self):
+        while True:
+            url = self.frontier.get_tbd_url()
+            if url is not None:
+                return url
+            if self.router.is_done(self.shard_id, self.frontier.is_idle):
+                return None
+            time.sleep(self.poll_delay)
+
+    def poll_tbd_url(self):
+        url, wait = self.frontier.poll_tbd_url(self.poll_delay)
+        if url is None and wait is None and not self.router.is_done(
+                self.shard_id, self.frontier.is_idle):
+            wait = self.poll_delay
+        return url, wait
+
+    def add_url(self, url, parent_links=0):
+        owner = shard_of(url, self.router.shard_count)
+        if owner == self.shard_id:
+            return self.frontier.add_url(url, parent_links=parent_links)
+        urlhash = get_urlhash(normalize(url))
+        if self.routed.add(url_fingerprint(urlhash)):
+            # New to this shard, the owner decides if it is new to the crawl.
+            self.outbox.append(urlhash, url, False, parent_links)
+            self.router.send(owner, url, parent_links)
+            return True
+        return False
+
+    def close(self):
+        self.outbox.close()
+        self.frontier.close()
+
+
+def run_shard(shard_id, config, restart, router, frontier_factory, worker_factory):
+    config = shard_config(config, shard_id, router.shard_count)
+    crawler = Crawler(
+        config, restart,
+        frontier_factory=lambda config, restart: ShardFrontier(
+            frontier_factory(config, restart), shard_id, router,
+            config.outbox_file, restart),
+        worker_factory=worker_factory)
+    crawler.start()
+
+
+class ShardedCrawler(object):
+    '''
+    Runs config.process_count crawler processes with config.threads_count
+    workers each. Urls are partitioned among the processes by host, so each
+    process keeps its own frontier and archive shard and the politeness of a
+    host is enforced by a single process.
+    '''
+    def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker):
+        self.config = config
+        self.restart = restart
+        self.logger = get_logger("CRAWLER")
+        self.frontier_factory = frontier_factory
+        self.worker_factory = worker_factory
+        self.processes = list()
+
+    def start_async(self):
+        router = ShardRouter(self.config.process_count)
+        self.processes = [
+            multiprocessing.Process(
+                target=run_shard,
+                args=(shard_id, self.config, self.restart, router,
+                      self.frontier_factory, self.worker_factory),
+                name=f"Shard-{shard_id}")
+            for shard_id in range(self.config.process_count)]
+        for process in self.processes:
+            process.start()
+        self.logger.info(f"Started {len(self.processes)} crawler processes.")
+
+    def start(self):
+        self.start_async()
+        self.join()
+
+    def join(self):
+        try:
+            for process in self.processes:
+                process.join()
+        except KeyboardInterrupt:
+            # The shard processes got the interrupt too, wait while they save their state.
+            for process in self.processes:
+                process.join()
+            raise
@@ -0,0 +1,147 @@
+import os
+import math
+import shutil
+from collections import deque
+
+
+def format_entry(url, score):
+    ''' One line of a spill segment or of the pending snapshot. '''
+    return url if score is None else f"{url}\t{score}"
+
+
+def parse_entry(line):
+    url, _, score = line.rstrip("\n").partition("\t")
+    return url, float(score) if score else None
+
+
+def score_bucket(score):
+    '''
+    Bucket of PrioritySpillQueue for score: higher scores get higher buckets,
+    on a log scale so that scorers with large scores (e.g. novelty) still
+    only need a few dozen buckets.
+    '''
+    return math.floor(4 * math.copysign(math.log1p(abs(score or 0)), score or 0))
+
+
+class SpillQueue(object):
+    '''
+    FIFO of urls kept in sequential segment files on disk, used by the
+    Frontier for the urls that do not fit its in-memory budget. Only the
+    segment being written and one batch being read are held in memory.
+    Not thread safe, the Frontier holds its lock around it.
+    '''
+    def __init__(self, directory, segment_size=10000):
+        self.directory = directory
+        self.segment_size = segment_size
+        # The queue is rebuilt from the pending snapshot on resume.
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        self.segments = deque()     # (path, url count) of closed segments
+        self.next_segment = 0
+        self.writer = None
+        self.written = 0
+        self.read_buffer = deque()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        ''' Yields (url, score) of every spilled url. '''
+        yield from self.read_buffer
+        if self.writer is not None:
+            self.writer.flush()
+        paths = [path for path, _ in self.segments]
+        if self.writer is not None:
+            paths.append(self.writer.name)
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    yield parse_entry(line)
+
+    def push(self, url, score=None):
+        if self.writer is None:
+            path = os.path.join(self.directory, f"{self.next_segment:08d}.urls")
+            self.next_segment += 1
+            self.writer = open(path, "w", encoding="utf-8")
+            self.written = 0
+        self.writer.write(format_entry(url, score) + "\n")
+        self.written += 1
+        self.size += 1
+        if self.written >= self.segment_size:
+            self._close_writer()
+
+    def pop_batch(self, count):
+        ''' Returns up to count (url, score) pairs in the order they were pushed. '''
+        count = min(count, self.size)
+        batch = list()
+        while len(batch) < count:
+            if not self.read_buffer:
+                self._read_segment()
+            while self.read_buffer and len(batch) < count:
+                batch.append(self.read_buffer.popleft())
+        self.size -= len(batch)
+        return batch
+
+    def _close_writer(self):
+        self.writer.close()
+        self.segments.append((self.writer.name, self.written))
+        self.writer = None
+
+    def _read_segment(self):
+        if not self.segments:
+            # Only the segment being written is left.
+            self._close_writer()
+        path, _ = self.segments.popleft()
+        with open(path, "r", encoding="utf-8") as file:
+            self.read_buffer.extend(parse_entry(line) for line in file)
+        os.remove(path)
+
+
+class PrioritySpillQueue(object):
+    '''
+    Spill queue of the priority Frontier: one SpillQueue per score_bucket,
+    and pop_batch returns the urls of the best bucket first, so urls come
+    back from disk roughly best first instead of in the order they were
+    spilled. Not thread safe, the Frontier holds its lock around it.
+    '''
+    def __init__(self, directory, segment_size=10000):
+        self.directory = directory
+        self.segment_size = segment_size
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        self.buckets = dict()       # score bucket -> SpillQueue
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        ''' Yields (url, score) of every spilled url. '''
+        for queue in self.buckets.values():
+            yield from queue
+
+    def push(self, url, score=None):
+        bucket = score_bucket(score)
+        queue = self.buckets.get(bucket)
+        if queue is None:
+            queue = self.buckets[bucket] = SpillQueue(
+                os.path.join(self.directory, f"{bucket:+05d}"), self.segment_size)
+        queue.push(url, score)
+        self.size += 1
+
+    def pop_batch(self, count):
+        ''' Returns up to count (url, score) pairs, from the best buckets. '''
+        batch = list()
+        for bucket in sorted(self.buckets, reverse=True):
+            if len(batch) >= count:
+                break
+            queue = self.buckets[bucket]
+            batch.extend(queue.pop_batch(count - len(batch)))
+            if not queue:
+                del self.buckets[bucket]
+                shutil.rmtree(queue.directory)
+        self.size -= len(batch)
+        return batch
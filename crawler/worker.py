@@ -2,8 +2,7 @@ from threading import Thread
 
 from utils.download import download
 from utils import get_logger
-from scraper import scraper
-import time
+from scraper import scraper, report_new_links
 
 
 class Worker(Thread):
@@ -19,13 +18,19 @@ class Worker(Thread):
             if not tbd_url:
                 self.logger.info("Frontier is empty. Stopping Crawler.")
                 break
-            resp = download(tbd_url, self.config, self.logger)
-            # self.logger.info(
-            #     f"Downloaded {tbd_url}, status <{resp.status}>, "
-            #     f"using cache {self.config.cache_server}.")
-            self.logger.info(f"#{str(len(self.frontier.save))} - {tbd_url}")  # added live url count
-            scraped_urls = scraper(tbd_url, resp)
-            for scraped_url in scraped_urls:
-                self.frontier.add_url(scraped_url)
-            self.frontier.mark_url_complete(tbd_url)
-            time.sleep(self.config.time_delay)
+            try:
+                resp = download(tbd_url, self.config, self.logger)
+                # self.logger.info(
+                #     f"Downloaded {tbd_url}, status <{resp.status}>, "
+                #     f"using cache {self.config.cache_server}.")
+                self.logger.info(f"#{self.frontier.discovered} - {tbd_url}")  # added live url count
+                scraped_urls = scraper(tbd_url, resp)
+                new_urls = [scraped_url for scraped_url in scraped_urls
+                            if self.frontier.add_url(scraped_url, parent_links=len(scraped_urls))]
+                report_new_links(tbd_url, new_urls)
+            except Exception:
+                self.logger.exception(f"Failed to crawl {tbd_url}.")
+            finally:
+                # Politeness is enforced per host by frontier.get_tbd_url.
+                # Always completed, the other workers wait for urls in progress.
+                self.frontier.mark_url_complete(tbd_url)
@@ -1,6 +1,6 @@
 import sys
 import re
-from collections import defaultdict
+from collections import defaultdict, Counter
 
 STOP_WORDS = ['a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', 'an', 'and', 'any', 'are', "aren't",
               'as', 'at', 'be', 'because', 'been', 'before', 'being', 'below', 'between', 'both', 'but', 'by', "can't",
@@ -22,41 +22,35 @@ STOP_WORDS = ['a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', '
 TABLE2 = str.maketrans('', '', "[]^_`{|}~?<=>*+#%!;[]:\'\",.()_”“‘’")
 
 
-def tokenize_page(page_text: str, ignore_stop_words: bool = False):
-    page_text = page_text.replace('\n', ' ').replace('\t', ' ').replace('/', ' ')
+# Runs of ASCII characters between whitespace, '/', '-' and '&', after TABLE2 is applied.
+# Parts with any non-ASCII character are skipped as a whole, for handling bad characters in words.
+TOKEN_PATTERN = re.compile(r"(?<![^\s/&\-])[^\s/&\-\u0080-\U0010ffff]+(?![^\s/&\-])")
+STOP_WORDS_SET = frozenset(STOP_WORDS)
+
+
+def tokenize_page(page_text: str, ignore_stop_words: bool = False) -> list:
     return tokenize_line(page_text, ignore_stop_words)
 
 
 def tokenize_line(line: str, ignore_stop_words: bool = False) -> list:
-    tokenlist = list()
-    for word in line.lower().translate(TABLE2).split():
-        # above removes characters that would be inside a token
-        # such as the ' in "won't" or periods in "www.google.com"
-        # then splits into list of words
-        # lower:O(N) + translate:O(N) + split:O(N) + forloop:O(N) = O(4N) = O(N)
-        wordlist = re.split('/|-|&', word)  # for splitting archaic dashed and slashed words like "fire-wood"
-        if len(wordlist) > 1:
-            for w in wordlist:  # O(N)
-                if w is not "":
-                    try:
-                        tokenlist.append(word.encode("ascii").decode())
-                    except UnicodeEncodeError:  # for handling bad characters in words
-                        pass
-        else:
-            try:
-                tokenlist.append(word.encode("ascii").decode())
-            except UnicodeEncodeError:  # for handling bad characters in word
-                pass
+    # lower and translate remove characters that would be inside a token, such as the ' in
+    # "won't" or periods in "www.google.com", then one pass of TOKEN_PATTERN splits
+    # whitespace and archaic dashed and slashed words like "fire-wood" into tokens
+    tokenlist = TOKEN_PATTERN.findall(line.lower().translate(TABLE2))
     if ignore_stop_words:
-        # remove_list = list()
-        # with open("stopwords.txt") as file:
-        #     for word in file:
-        #         remove_list.append(word.strip("\n"))
-        # print(remove_list)
-        tokenlist = [word for word in tokenlist if word not in STOP_WORDS]
+        tokenlist = [word for word in tokenlist if word not in STOP_WORDS_SET]
     return tokenlist
 
 
+def count_page(page_text: str, ignore_stop_words: bool = False) -> Counter:
+    """The tokens of page_text counted, as a Counter of token: count."""
+    counts = Counter(TOKEN_PATTERN.findall(page_text.lower().translate(TABLE2)))
+    if ignore_stop_words:
+        for word in STOP_WORDS_SET.intersection(counts):
+            del counts[word]
+    return counts
+
+
 def tokenize_file(text_file_path) -> list:
     # tokenize() reads characters from ASCII and its superset UTF-8 encoded files only
     # O(N) because despite nested for loops, as there is only N words ever visited
@@ -75,7 +69,9 @@ def tokenize_file(text_file_path) -> list:
 def computeWordFrequencies(tokenlist: list) -> dict:
     # O(N) Time Complexity, because worst case each word in for loop is visited once.
     tokencount = defaultdict(int)  # str: int
-    if tokenlist is not None:
+    if isinstance(tokenlist, dict):  # already counted, e.g. by count_page
+        tokencount.update(tokenlist)
+    elif tokenlist is not None:
         for word in tokenlist:
             tokencount[word] += 1
     return tokencount
@@ -0,0 +1,82 @@
+import os
+from hashlib import blake2b
+from threading import Lock
+
+from utils import get_urlhash, url_fingerprint
+from utils.fingerprints import FingerprintDict
+
+
+def body_checksum(body) -> int:
+    """64 bit checksum of a response body (bytes)."""
+    return int.from_bytes(blake2b(body, digest_size=8).digest(), "little")
+
+
+class ChecksumIndex(object):
+    """
+    Checksums of the raw bodies of the scraped pages, to drop pages whose body
+    was already scraped under another url (trailing slash variants,
+    index.html, flattened redirects) before they are parsed. Every new body
+    appends "checksum url" to path, every duplicate appends "url checksum"
+    to alias_path. Only the fingerprint of the first url of every checksum
+    is kept in memory, path is reloaded on start.
+    """
+    def __init__(self, path, alias_path, restart=False):
+        self.path = path
+        self.alias_path = alias_path
+        self.lock = Lock()
+        # checksum -> url_fingerprint of the first url scraped with that body
+        self.canonical = FingerprintDict()
+        self.duplicates = 0
+        for file_path in (path, alias_path):
+            directory = os.path.dirname(file_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            if restart and os.path.exists(file_path):
+                os.remove(file_path)
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    checksum, _, url = line.rstrip("\n").partition(" ")
+                    if url:     # else torn by a crash
+                        self.canonical[int(checksum, 16) or 1] = url_fingerprint(get_urlhash(url))
+        self.file = open(path, "a")
+        self.alias_file = open(alias_path, "a")
+
+    def canonical_url(self, url, body):
+        """
+        The hex checksum of body if it was first scraped under another url,
+        url is then recorded as an alias, else None and body is indexed.
+        """
+        checksum = body_checksum(body)
+        url_id = url_fingerprint(get_urlhash(url))
+        with self.lock:
+            canonical = self.canonical.get(checksum or 1)
+            if canonical is None:
+                self.canonical[checksum or 1] = url_id
+                self.file.write(f"{checksum:016x} {url}\n")
+                self.file.flush()
+                return None
+            if canonical == url_id:
+                # Scraped again, e.g. after a crash.
+                return None
+            self.duplicates += 1
+            self.alias_file.write(f"{url} {checksum:016x}\n")
+            self.alias_file.flush()
+            return f"{checksum:016x}"
+
+    def aliases(self) -> dict:
+        """Duplicate url -> canonical url, read from alias_path and path."""
+        with self.lock:
+            self.file.flush()
+            self.alias_file.flush()
+            with open(self.path) as file:
+                urls = dict(line.split() for line in file if len(line.split()) == 2)
+            with open(self.alias_path) as file:
+                aliases = dict(line.split() for line in file if len(line.split()) == 2)
+        # Older alias files hold the canonical url itself.
+        return {url: urls.get(canonical, canonical) for url, canonical in aliases.items()}
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            self.alias_file.close()
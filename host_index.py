@@ -0,0 +1,115 @@
+"""
+Index of the hosts of a set of urls: every distinct host is split into
+(subdomain, domain, suffix) once, by tldextract's public suffix list, and
+every url maps to the id of its host. Per subdomain and per host page
+counts and page sets are then one pass over the urls, without parsing any
+url again.
+
+    index = HostIndex(urls)
+    index.subdomain_pages(".ics.uci.edu")   # {"vision": 120, "www": 5324, ...}
+"""
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import tldextract
+
+
+def url_host(url) -> str:
+    """ Lower case host of url, without user info or port. """
+    netloc = url.split("/")[2] if "//" in url else url.split("/")[0]
+    return netloc.rsplit("@", 1)[-1].split(":")[0].lower()
+
+
+@lru_cache(maxsize=None)
+def split_host(host) -> tuple:
+    """ (subdomain, domain, suffix) of host, e.g. ("vision.ics", "uci", "edu"). """
+    parts = tldextract.extract(host)
+    return parts.subdomain, parts.domain, parts.suffix
+
+
+class HostIndex(object):
+    """
+    Host ids of urls. hosts[id] is the host of an id and splits[id] its
+    split_host, url_hosts maps each url added to its host id, so a url added
+    twice is one page.
+    """
+    def __init__(self, urls=()):
+        self.hosts = list()
+        self.splits = list()
+        self.host_ids = dict()      # host -> id
+        self.url_hosts = dict()     # url -> host id
+        for url in urls:
+            self.add(url)
+
+    def __len__(self):
+        return len(self.url_hosts)
+
+    def host_id(self, host) -> int:
+        host_id = self.host_ids.get(host)
+        if host_id is None:
+            host_id = self.host_ids[host] = len(self.hosts)
+            self.hosts.append(host)
+            self.splits.append(split_host(host))
+        return host_id
+
+    def add(self, url) -> int:
+        host_id = self.url_hosts.get(url)
+        if host_id is None:
+            host_id = self.url_hosts[url] = self.host_id(url_host(url))
+        return host_id
+
+    def merge(self, other):
+        """ Adds the urls of another index, translating its host ids. """
+        ids = [self.host_id(host) for host in other.hosts]
+        for url, host_id in other.url_hosts.items():
+            self.url_hosts.setdefault(url, ids[host_id])
+
+    def host_pages(self) -> Counter:
+        """ Counter of the pages per host. """
+        pages = Counter(self.url_hosts.values())
+        return Counter({self.hosts[host_id]: count for host_id, count in pages.items()})
+
+    def domain_pages(self) -> Counter:
+        """ Counter of the pages per registered domain, e.g. "uci.edu". """
+        domains = Counter()
+        for host_id, count in Counter(self.url_hosts.values()).items():
+            _, domain, suffix = self.splits[host_id]
+            domains[f"{domain}.{suffix}" if suffix else domain] += count
+        return domains
+
+    def subdomains(self, domain) -> dict:
+        """
+        {host id: subdomain} of the hosts in domain (e.g. ".ics.uci.edu" or
+        "uci.edu"), the subdomain being the part of the host before domain:
+        "vision" for vision.ics.uci.edu and "" for ics.uci.edu in ".ics.uci.edu".
+        """
+        parent, registered, suffix = split_host(domain.strip("."))
+        subdomains = dict()
+        for host_id, (subdomain, host_registered, host_suffix) in enumerate(self.splits):
+            if (host_registered, host_suffix) != (registered, suffix):
+                continue
+            if not parent:
+                subdomains[host_id] = subdomain
+            elif subdomain == parent:
+                subdomains[host_id] = ""
+            elif subdomain.endswith("." + parent):
+                subdomains[host_id] = subdomain[:-len(parent) - 1]
+        return subdomains
+
+    def subdomain_urls(self, domain) -> dict:
+        """ {subdomain: set of urls} of the hosts in domain, see subdomains. """
+        subdomains = self.subdomains(domain)
+        urls = defaultdict(set)
+        for url, host_id in self.url_hosts.items():
+            if host_id in subdomains:
+                urls[subdomains[host_id]].add(url)
+        return dict(urls)
+
+    def subdomain_pages(self, domain) -> dict:
+        """ {subdomain: number of pages} of the hosts in domain, see subdomains. """
+        subdomains = self.subdomains(domain)
+        pages = Counter()
+        for host_id, count in Counter(self.url_hosts.values()).items():
+            if host_id in subdomains:
+                pages[subdomains[host_id]] += count
+        return dict(pages)
@@ -0,0 +1,67 @@
+from lxml import etree
+from bs4 import BeautifulSoup
+
+# Elements whose text is not visible, also skipped by BeautifulSoup's .text.
+HIDDEN_TAGS = frozenset(["script", "style", "template"])
+
+
+class _TextAndLinks(object):
+    """lxml parser target collecting visible text and <a> hrefs as the page is parsed."""
+    def __init__(self):
+        self.text = list()
+        self.links = list()
+        self.hidden = 0
+
+    def start(self, tag, attrib):
+        if tag in HIDDEN_TAGS:
+            self.hidden += 1
+        elif tag == "a":
+            href = attrib.get("href")
+            if href is not None:
+                self.links.append(href)
+
+    def end(self, tag):
+        if tag in HIDDEN_TAGS and self.hidden:
+            self.hidden -= 1
+
+    def data(self, data):
+        if not self.hidden:
+            self.text.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return "".join(self.text), self.links
+
+
+def extract_lxml(content, encoding=None) -> tuple:
+    """
+    Extract (visible text, hrefs) from html bytes in a single pass, with
+    lxml's parser calling back into a target instead of building a tree.
+    """
+    target = _TextAndLinks()
+    try:
+        parser = etree.HTMLParser(target=target, encoding=encoding)
+    except LookupError:
+        # Unknown declared charset, let lxml detect it.
+        parser = etree.HTMLParser(target=target)
+    try:
+        parser.feed(content)
+        return parser.close()
+    except etree.LxmlError:
+        # Empty or broken page, keep whatever was parsed.
+        return target.close()
+
+
+def extract_bs4(content, encoding=None) -> tuple:
+    """
+    Extract (text, hrefs) by building a BeautifulSoup tree, the original
+    extraction, kept to compare against extract_lxml.
+    """
+    parsed_html = BeautifulSoup(content, features="lxml", from_encoding=encoding)
+    return parsed_html.text, [a.get("href") for a in parsed_html.find_all("a")
+                              if a.get("href") is not None]
+
+
+EXTRACTORS = {"lxml": extract_lxml, "bs4": extract_bs4}
@@ -4,14 +4,28 @@ import json
 import numpy as np
 from matplotlib import pyplot as plt
 import json_lines
-import tldextract
-from collections import defaultdict
+from analytics import run_reports
 
 DEFAULT_JSON_PATH = "Logs/data_17723.json"
 DEFAULT_DOMAIN_URL = ".ics.uci.edu"
+# Archive the crawler writes to, and its background ArchiveWriter (None to write
+# in the caller's thread), set from config by scraper.configure.
+ARCHIVE_PATH = DEFAULT_JSON_PATH
+ARCHIVE_WRITER = None
 
-def archive_json_lines(url, token_list, jsonline_path=DEFAULT_JSON_PATH):
-    word_freqs = ctoken.computeWordFrequencies(token_list)
+def archive_json_lines(url, token_list, jsonline_path=None):
+    """
+    Append {url: word frequencies} to the json lines archive, through ARCHIVE_WRITER when
+    there is one. token_list can also be a dict of token: count, which is archived as is.
+    """
+    if isinstance(token_list, dict):
+        word_freqs = token_list
+    else:
+        word_freqs = ctoken.computeWordFrequencies(token_list)
+    if jsonline_path is None and ARCHIVE_WRITER is not None:
+        ARCHIVE_WRITER.write(url, word_freqs)
+        return
+    jsonline_path = jsonline_path or ARCHIVE_PATH
     with open(jsonline_path, "a", encoding='utf-8') as f:
         json_record = json.dumps({url: word_freqs}, ensure_ascii=False)
         f.write(json_record + '\n')
@@ -66,23 +80,15 @@ def access_jsonlines_tokendicts(json_path=DEFAULT_JSON_PATH) -> "list of token d
 
 def access_jsonlines_urls(json_path=DEFAULT_JSON_PATH):
     """Returns list of urls. [url]"""
-    token_dict_set = set()
-    with open(json_path, 'rb') as f:
-        for line in json_lines.reader(f):
-            for url in line.keys():
-                token_dict_set.add(url)
-    return token_dict_set
-
-def common_words(json_path=DEFAULT_JSON_PATH):
-    mega_dict = dict()
-    token_dict_list = access_jsonlines_tokendicts(json_path)
-    for dictionary in token_dict_list:
-        for key in dictionary.keys():
-            if key in mega_dict.keys():
-                mega_dict[key] += dictionary[key]
-            else:
-                mega_dict[key] = dictionary[key]
-    return mega_dict
+    return run_reports(json_path, ["urls"])["urls"]
+
+def common_words(json_path=DEFAULT_JSON_PATH, processes=None):
+    """Returns {word: count} over the entire json file, counted by processes processes (None = one per cpu)"""
+    return dict(run_reports(json_path, ["common_words"], processes=processes)["common_words"])
+
+def top_words(json_path=DEFAULT_JSON_PATH, n=50, processes=None):
+    """Returns the n most common [(word, count)] in bounded memory, see analytics.HeavyHitters"""
+    return run_reports(json_path, ["top_words"], processes=processes)["top_words"].most_common(n)
 
 def compute_token_count(token_dict):
     """Computes token count for single token dict"""
@@ -91,32 +97,20 @@ def compute_token_count(token_dict):
 
 def token_count_dict(json_path=DEFAULT_JSON_PATH) -> dict:
     """Computes token counts for entire json file, returns {url: token_count}"""
-    token_counts = {}  # {url: token_count}
-    with open(DEFAULT_JSON_PATH, 'rb') as f:
-        for line in json_lines.reader(f):
-            json_dict = line
-            for url in json_dict.keys():
-                token_counts[url] = compute_token_count(json_dict[url])
-    return token_counts
+    return run_reports(json_path, ["token_counts"])["token_counts"]
 
 
 def block_lengths_dict(json_path=DEFAULT_JSON_PATH) -> dict:
-    """Computes token counts for entire json lines file, returns {url: token_count}"""
-    block_lengths = {}  # {url: token_count}
-    with open(DEFAULT_JSON_PATH, 'rb') as f:
-        for line in json_lines.reader(f):
-            json_dict = line
-            for url in json_dict.keys():
-                block_lengths[url] = len([i for i in url.split('/') if i])
-    return block_lengths
+    """Computes block lengths for entire json lines file, returns {url: block_length}"""
+    return run_reports(json_path, ["block_lengths"])["block_lengths"]
 
 
 def compute_quartiles(counts_dict):
     """Returns Q1 and Q3 from {key:int} dictionary"""
     # from https://www.geeksforgeeks.org/interquartile-range-and-quartile-deviation-using-numpy-and-scipy/
-    q1 = np.percentile(list(counts_dict.values()), 25, interpolation='midpoint')
+    q1 = np.percentile(list(counts_dict.values()), 25, method='midpoint')
     # Third quartile (Q3)
-    q3 = np.percentile(list(counts_dict.values()), 75, interpolation='midpoint')
+    q3 = np.percentile(list(counts_dict.values()), 75, method='midpoint')
     return q1, q3
 
 
@@ -136,9 +130,10 @@ def compute_optimal_token_minimum(token_counts) -> int:
     return low_threshold
 
 
-def token_outliers(json_path=DEFAULT_JSON_PATH, high=True, low=True) -> dict:
-    """Returns a dict containing outlier {url: int} pairs"""
-    token_counts = token_count_dict(json_path)  # {url: token_count}
+def token_outliers(json_path=DEFAULT_JSON_PATH, high=True, low=True, token_counts=None) -> dict:
+    """Returns a dict containing outlier {url: int} pairs, of token_counts if given"""
+    if token_counts is None:
+        token_counts = token_count_dict(json_path)  # {url: token_count}
     q1, q3 = compute_quartiles(token_counts)
     iqr = q3 - q1
     high_threshold = q3 + 1.5 * iqr
@@ -156,9 +151,10 @@ def token_outliers(json_path=DEFAULT_JSON_PATH, high=True, low=True) -> dict:
     else:
         return {}
 
-def block_outliers(json_path=DEFAULT_JSON_PATH, high=True, low=True) -> dict:
-    """Returns a dict containing outlier {url: int} pairs"""
-    block_counts = block_lengths_dict(json_path)  # {url: token_count}
+def block_outliers(json_path=DEFAULT_JSON_PATH, high=True, low=True, block_counts=None) -> dict:
+    """Returns a dict containing outlier {url: int} pairs, of block_counts if given"""
+    if block_counts is None:
+        block_counts = block_lengths_dict(json_path)  # {url: block_length}
     q1, q3 = compute_quartiles(block_counts)
     iqr = q3 - q1
     multi = 1.5
@@ -178,30 +174,14 @@ def block_outliers(json_path=DEFAULT_JSON_PATH, high=True, low=True) -> dict:
         return {}
 
 def subdomain_dict(json_path=DEFAULT_JSON_PATH, domain=DEFAULT_DOMAIN_URL) -> dict:
-    """Computes a dictionary containing subdomains for the passed in domain and their number of unique pages"""
-    subdomain_pages = {}
-    with open(json_path, 'r') as f:
-        for line in json_lines.reader(f):
-            json_dict = line
-            for url in json_dict.keys():
-                dom = url.split("/")[2]
-                if domain in dom:
-                    subdom = dom.split(".")[0]
-                    if dom in subdomain_pages.keys():
-                        subdomain_pages[dom] += 1
-                    else:
-                        subdomain_pages[dom] = 1
-    print(sum(subdomain_pages.values()))
-    return subdomain_pages
-
-def c_subdomain_dict(file=DEFAULT_JSON_PATH):
-    ics_urls = [url for url in access_jsonlines_urls(file) if ".ics.uci.edu" in url]
-    mega = defaultdict(int)
-    for sub in {tldextract.extract(url).subdomain for url in ics_urls}:
-        for url in ics_urls:
-            if sub[:-4] == tldextract.extract(url).subdomain[:-4]:
-                mega[sub[:-4]] += 1
-    return mega
+    """Computes a dictionary containing the hosts in the passed in domain and their number of unique pages"""
+    index = run_reports(json_path, ["host_index"])["host_index"]
+    host_pages = index.host_pages()
+    return {index.hosts[host_id]: host_pages[index.hosts[host_id]] for host_id in index.subdomains(domain)}
+
+def c_subdomain_dict(file=DEFAULT_JSON_PATH, domain=DEFAULT_DOMAIN_URL):
+    """Returns {subdomain: number of unique pages} of the passed in domain, e.g. {"vision": 120} for vision.ics.uci.edu"""
+    return run_reports(file, ["host_index"])["host_index"].subdomain_pages(domain)
 
 def post_charts(merge):
     plt.xlabel("tokens")
@@ -231,27 +211,30 @@ def post_charts(merge):
 
 if __name__ == "__main__":
     file = "Logs/data_17723.json"
-    # # Question 1
-    # print("Number of 'Unique' Pages Found: ", len(access_jsonlines_urls(file)))
-    # print()
-    #
-    # # Question 2
-    # token_dict_list = access_jsonlines_tokendicts(file)
-    # highest_token_count = max([sum(token_dict.values()) for token_dict in token_dict_list])
-    # print(f"Longest page token count: {highest_token_count}")
-    # print()
-    #
-    # # Question 3
-    # common_words = common_words(file)
-    # meta_list = [(item[0], item[1]) for item in sorted(common_words.items(), key=lambda item: item[1], reverse=True)]
-    # print("Top 50 words and counts, by frequency")
-    # [print(f"{i[0]}, {i[1]}") for i in meta_list[:50]]
-    # print()
-    #
-    # # Question 4
-    # mega = c_subdomain_dict(file)
-    # print("Sub domains and counts, alphabetical")
-    # [print(f"{sub}, {mega[sub]}") for sub in sorted(mega.keys())]
+    # Every report in one pass over the archive, cached in file + ".analytics" so that
+    # running again with other thresholds does not read the archive.
+    reports = run_reports(file, ["urls", "token_counts", "block_lengths", "common_words", "host_index"],
+                          processes=None)
+
+    # Question 1
+    print("Number of 'Unique' Pages Found: ", len(reports["urls"]))
+    print()
+
+    # Question 2
+    longest_url = max(reports["token_counts"], key=reports["token_counts"].get)
+    print(f"Longest page token count: {reports['token_counts'][longest_url]} ({longest_url})")
+    print()
+
+    # Question 3
+    print("Top 50 words and counts, by frequency")
+    [print(f"{word}, {count}") for word, count in reports["common_words"].most_common(50)]
+    print()
+
+    # Question 4
+    mega = reports["host_index"].subdomain_pages(DEFAULT_DOMAIN_URL)
+    print("Sub domains and counts, alphabetical")
+    [print(f"{sub}, {mega[sub]}") for sub in sorted(mega.keys())]
+    print()
 
     URL_LENGTH_THRESHOLD = 20  # in blocks of url , usually around 3-5, 8
     TOKEN_COUNT_THRESHOLD = 0 # minimum token count was 204 359
@@ -259,13 +242,13 @@ if __name__ == "__main__":
     trim_valid_outliers = False
     trim_outliers = True
 
-    t_dict = token_count_dict(json_path=file)
+    t_dict = reports["token_counts"]
     t_dict_threshed = {pair[0]: pair[1] for pair in t_dict.items() if not pair[1] < TOKEN_COUNT_THRESHOLD}
-    t_outliers = token_outliers(json_path=file, low=trim_outliers, high=trim_valid_outliers)
+    t_outliers = token_outliers(low=trim_outliers, high=trim_valid_outliers, token_counts=t_dict)
 
-    b_dict = block_lengths_dict(json_path=file)
+    b_dict = reports["block_lengths"]
     b_dict_threshed = {pair[0]: pair[1] for pair in b_dict.items() if not pair[1] > URL_LENGTH_THRESHOLD}
-    b_outliers = block_outliers(json_path=file, low=trim_valid_outliers, high=trim_outliers)
+    b_outliers = block_outliers(low=trim_valid_outliers, high=trim_outliers, block_counts=b_dict)
 
     plt.ylabel("token length")
     plt.xlabel("block length")
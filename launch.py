@@ -4,12 +4,14 @@ from argparse import ArgumentParser
 from utils.server_registration import get_cache_server
 from utils.config import Config
 from crawler import Crawler
+from crawler.worker import Worker
+from crawler.sharded import ShardedCrawler
 import os
 
 DELETE_DATA_FILES = False # set this to false if you want to stop program and keep previous data
 DELETE_LOG_FILES = False  # set to false if you want to keep previous url log file
 
-DATA_FILES = ["data.json", "frontier.shelve.db"]
+DATA_FILES = ["data.json", "frontier.shelve.db", "frontier.journal", "frontier.pending", "frontier.seen"]
 LOG_FILES = ["Logs/URL_LOG.txt"]
 
 def main(config_file, restart):
@@ -24,8 +26,19 @@ def main(config_file, restart):
     cparser = ConfigParser()
     cparser.read(config_file)
     config = Config(cparser)
-    config.cache_server = get_cache_server(config, restart)
-    crawler = Crawler(config, restart)
+    if config.response_mode != "replay":
+        config.cache_server = get_cache_server(config, restart)
+    worker_factory = Worker
+    if config.worker == "async":
+        from crawler.async_worker import AsyncWorker
+        worker_factory = AsyncWorker
+    elif config.worker == "pipeline":
+        from crawler.pipeline_worker import PipelineWorker
+        worker_factory = PipelineWorker
+    if config.process_count > 1:
+        crawler = ShardedCrawler(config, restart, worker_factory=worker_factory)
+    else:
+        crawler = Crawler(config, restart, worker_factory=worker_factory)
     crawler.start()
 
 
@@ -0,0 +1,157 @@
+import os
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+from hashlib import blake2b
+from threading import Lock
+
+import numpy as np
+
+from utils import get_urlhash, url_fingerprint
+
+FINGERPRINT_BITS = 64
+# Start of an index file of (fingerprint, url fingerprint) records, files
+# without it hold fingerprints only.
+MAGIC = b"SIMHASH2"
+
+
+@lru_cache(maxsize=262144)
+def token_hash(token) -> int:
+    return int.from_bytes(blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(token_list) -> int:
+    """
+    64 bit SimHash of a token list (or of token counts), each distinct token
+    weighted by its count. Pages that share most of their tokens get
+    fingerprints a few bits apart.
+    """
+    counts = token_list if isinstance(token_list, dict) else Counter(token_list)
+    if not counts:
+        return 0
+    hashes = np.fromiter((token_hash(token) for token in counts), dtype=np.uint64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(len(counts), FINGERPRINT_BITS)
+    # Sum of +weight for each set bit and -weight for each clear bit.
+    votes = weights @ (bits.astype(np.int64) * 2 - 1)
+    return int(np.packbits(votes > 0).view(np.uint64)[0])
+
+
+def hamming_distance(a, b) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex(object):
+    """
+    SimHash fingerprints of the scraped pages, to find pages within distance
+    bits of an earlier one. The 64 bits are split into distance + 1 bands, two
+    fingerprints within distance bits agree on at least one band, so only the
+    fingerprints sharing a band with the page are compared. Each band table
+    maps a band value to an array of (fingerprint, url fingerprint) pairs,
+    16 bytes per page per band. The pairs are appended to path and the tables
+    rebuilt from it on start. A page matching its own url's fingerprint was
+    scraped again (e.g. after a crash) and is not a duplicate.
+    Pages with fewer than min_tokens distinct tokens are never duplicates,
+    their fingerprints are too unstable (e.g. pages that are mostly links).
+    """
+    def __init__(self, path, distance=3, min_tokens=20, restart=False):
+        assert 0 <= distance < 16, "NEAR_DUPLICATE_DISTANCE should be between 0 and 15"
+        self.path = path
+        self.distance = distance
+        self.min_tokens = min_tokens
+        self.lock = Lock()
+        bands = distance + 1
+        widths = [FINGERPRINT_BITS // bands + (band < FINGERPRINT_BITS % bands) for band in range(bands)]
+        self.bands = list()     # (shift, mask)
+        shift = 0
+        for width in widths:
+            self.bands.append((shift, (1 << width) - 1))
+            shift += width
+        self.tables = [dict() for _ in self.bands]
+        self.count = 0
+        self.duplicates = 0
+        if restart and os.path.exists(path):
+            os.remove(path)
+        self._load()
+        self.file = open(path, "ab")
+
+    def _load(self):
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            with open(self.path, "wb") as file:
+                file.write(MAGIC)
+            return
+        records = array("Q")
+        with open(self.path, "rb") as file:
+            data = file.read()
+        if data.startswith(MAGIC):
+            start = len(MAGIC)
+            whole = start + (len(data) - start) // 16 * 16
+            records.frombytes(data[start:whole])
+            if whole < len(data):
+                # Drop a record torn by a crash.
+                with open(self.path, "r+b") as file:
+                    file.truncate(whole)
+        else:
+            # Fingerprints only, their urls are unknown (0).
+            for fingerprint in array("Q", data[:len(data) - len(data) % 8]):
+                records.extend((fingerprint, 0))
+            with open(self.path, "wb") as file:
+                file.write(MAGIC + records.tobytes())
+        for fingerprint, url_id in zip(records[::2], records[1::2]):
+            self._insert(fingerprint, url_id)
+
+    def _insert(self, fingerprint, url_id):
+        for (shift, mask), table in zip(self.bands, self.tables):
+            key = (fingerprint >> shift) & mask
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = bucket = array("Q")
+            bucket.append(fingerprint)
+            bucket.append(url_id)
+        self.count += 1
+
+    def _matches(self, fingerprint):
+        """Yields (fingerprint, url fingerprint) of the indexed pages within distance bits."""
+        for (shift, mask), table in zip(self.bands, self.tables):
+            bucket = table.get((fingerprint >> shift) & mask, ())
+            for other, url_id in zip(bucket[::2], bucket[1::2]):
+                if hamming_distance(fingerprint, other) <= self.distance:
+                    yield other, url_id
+
+    def find(self, fingerprint):
+        """An indexed fingerprint within distance bits of fingerprint, or None."""
+        for other, _ in self._matches(fingerprint):
+            return other
+        return None
+
+    def check_and_add(self, token_list, url=None) -> bool:
+        """
+        Whether the page url with token_list is a near duplicate of an indexed
+        page of another url, indexes it if it is not.
+        """
+        counts = token_list if isinstance(token_list, dict) else Counter(token_list)
+        if len(counts) < self.min_tokens:
+            return False
+        fingerprint = simhash(counts)
+        url_id = url_fingerprint(get_urlhash(url)) if url is not None else 0
+        with self.lock:
+            matches = {match_url for _, match_url in self._matches(fingerprint)}
+            if url_id and url_id in matches:
+                # Scraped again, e.g. after a crash, it is already indexed.
+                return False
+            if matches:
+                self.duplicates += 1
+                return True
+            self._insert(fingerprint, url_id)
+            self.file.write(fingerprint.to_bytes(8, sys.byteorder) + url_id.to_bytes(8, sys.byteorder))
+            self.file.flush()
+            return False
+
+    def memory_bytes(self) -> int:
+        return sum(bucket.buffer_info()[1] * bucket.itemsize
+                   for table in self.tables for bucket in table.values())
+
+    def close(self):
+        with self.lock:
+            self.file.close()
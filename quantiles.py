@@ -0,0 +1,136 @@
+import math
+import random
+from threading import Lock
+
+from url_filter import url_blocks
+
+
+class KLLSketch(object):
+    """
+    Streaming quantile sketch (Karnin, Lang and Liberty, "Optimal Quantile
+    Approximation in Streams"). Values are kept in compactors, level h
+    holding values that stand for 2^h values each. A full compactor is
+    sorted and every other value, starting at a random offset, is promoted
+    to the next level. Memory stays around 3k values however many are
+    added, with a rank error of about 1.7 / k. Sketches of different
+    streams can be merged.
+    """
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.random = random.Random(seed)
+        self.compactors = list()
+        self.count = 0
+        self.size = 0
+        self.max_size = 0
+        self._grow()
+
+    def _capacity(self, level) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append(list())
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self._grow()
+                compactor.sort()
+                # An odd value out stays at this level.
+                keep = compactor.pop() if len(compactor) % 2 else None
+                self.compactors[level + 1].extend(compactor[self.random.random() < 0.5::2])
+                compactor.clear()
+                if keep is not None:
+                    compactor.append(keep)
+                self.size = sum(map(len, self.compactors))
+                if self.size < self.max_size:
+                    break
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.count += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def merge(self, other):
+        """Adds the values of another sketch to this one."""
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        self.size = sum(map(len, self.compactors))
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantile(self, q):
+        """Approximate q quantile (0 <= q <= 1) of the added values, None if there are none."""
+        weighted = sorted(
+            (value, 1 << level)
+            for level, compactor in enumerate(self.compactors) for value in compactor)
+        if not weighted:
+            return None
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def quartiles(self) -> tuple:
+        return self.quantile(0.25), self.quantile(0.75)
+
+    def __len__(self):
+        return self.count
+
+
+class AdaptiveThresholds(object):
+    """
+    The outlier thresholds of json_utils (quartile -/+ multiplier * iqr),
+    kept up to date while crawling from a KLLSketch of the token counts of
+    the parsed pages and one of the url block lengths of the links they
+    contain. Both are measured before the thresholds apply, so cutting pages
+    does not move them. Recomputed every update_pages pages once min_pages
+    pages were seen, until then token_minimum and block_maximum are None.
+    """
+    def __init__(self, min_pages=200, update_pages=100, multiplier=1.5, k=200, logger=None):
+        self.min_pages = min_pages
+        self.update_pages = update_pages
+        self.multiplier = multiplier
+        self.logger = logger
+        self.lock = Lock()
+        self.token_counts = KLLSketch(k)
+        self.block_lengths = KLLSketch(k)
+        self.token_minimum = None
+        self.block_maximum = None
+
+    def observe(self, token_count, links):
+        with self.lock:
+            self.token_counts.update(token_count)
+            for link in links:
+                self.block_lengths.update(url_blocks(link))
+            pages = len(self.token_counts)
+            if pages >= self.min_pages and (pages - self.min_pages) % self.update_pages == 0:
+                self._update(pages)
+
+    def too_short(self, token_count) -> bool:
+        return self.token_minimum is not None and token_count < self.token_minimum
+
+    def too_deep(self, link) -> bool:
+        return self.block_maximum is not None and url_blocks(link) > self.block_maximum
+
+    def _update(self, pages):
+        q1, q3 = self.token_counts.quartiles()
+        self.token_minimum = q1 - self.multiplier * (q3 - q1)
+        if self.block_lengths:
+            q1, q3 = self.block_lengths.quartiles()
+            self.block_maximum = q3 + self.multiplier * (q3 - q1)
+        if self.logger:
+            self.logger.info(
+                f"After {pages} pages: token minimum {self.token_minimum:.1f}, "
+                f"block maximum {self.block_maximum}.")
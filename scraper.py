@@ -1,150 +1,208 @@
-import re
-import urllib.parse
-from urllib.parse import urlparse
-from urllib.parse import urljoin
-from bs4 import BeautifulSoup
 import json
-import tokenizer
-import ctoken
-import lxml  # required for BS4
+import tokenizers
 from os import path
 import json_utils
-
-# Tokenizer Select
-# TOKENIZER = tokenizer.tokenize
-TOKENIZER = ctoken.tokenize_page
+import html_extract
+from url_filter import UrlFilter
+from trap_detector import TrapDetector
+from near_duplicates import NearDuplicateIndex
+from exact_duplicates import ChecksumIndex
+from archive_writer import ArchiveWriter
+from quantiles import AdaptiveThresholds
+from utils import get_logger
+
+# Tokenizer Select, set from config by configure(), returns a Counter of token: count
+TOKENIZER = tokenizers.get_tokenizer("ctoken")
+
+# Extractor Select, set from config by configure()
+# EXTRACTOR = html_extract.extract_bs4
+EXTRACTOR = html_extract.extract_lxml
 
 URL_LENGTH_THRESHOLD = 100  # in blocks of url , usually around 3-5, 8
 TOKEN_COUNT_THRESHOLD = 0
 
+# Url rules, compiled once, rebuilt by configure()
+URL_FILTER = UrlFilter(max_blocks=URL_LENGTH_THRESHOLD)
+# Learned url template traps, set from config by configure() (None = off)
+TRAP_DETECTOR = None
+# SimHash index of the archived pages, set from config by configure() (None = off)
+NEAR_DUPLICATES = None
+# Checksums of the scraped bodies, set from config by configure() (None = off)
+CHECKSUMS = None
+# Outlier thresholds learned while crawling, set from config by configure() (None = off)
+THRESHOLDS = None
+
+
+def configure(config, restart=False):
+    """
+    Apply the crawler config to the scraper, called once per crawling process.
+    """
+    global TRAP_DETECTOR, NEAR_DUPLICATES, CHECKSUMS, THRESHOLDS
+    configure_parser(config)
+    json_utils.ARCHIVE_PATH = config.archive_file
+    TRAP_DETECTOR = None
+    if config.trap_detection:
+        TRAP_DETECTOR = TrapDetector(
+            sample=config.trap_sample, min_yield=config.trap_min_yield,
+            min_tokens=config.trap_min_tokens, throttle=config.trap_throttle,
+            cutoff=config.trap_cutoff, logger=get_logger("TRAPS"))
+    THRESHOLDS = None
+    if config.adaptive_thresholds:
+        THRESHOLDS = AdaptiveThresholds(
+            min_pages=config.adaptive_min_pages, update_pages=config.adaptive_update_pages,
+            multiplier=config.outlier_iqr_multiplier, logger=get_logger("THRESHOLDS"))
+    close()
+    if config.near_duplicate_detection:
+        NEAR_DUPLICATES = NearDuplicateIndex(
+            config.near_duplicates_file, distance=config.near_duplicate_distance,
+            restart=restart)
+    if config.exact_duplicate_detection:
+        CHECKSUMS = ChecksumIndex(config.checksums_file, config.aliases_file, restart=restart)
+    if config.archive_writer:
+        json_utils.ARCHIVE_WRITER = ArchiveWriter(
+            config.archive_file, flush_records=config.archive_flush_records,
+            flush_ms=config.archive_flush_ms, fsync=config.archive_fsync,
+            rotate_bytes=config.archive_rotate_mb * 1024 * 1024, logger=get_logger("ARCHIVE"))
+
+
+def configure_parser(config):
+    """
+    Apply the config of the stateless parse stage only, also called in each parse process.
+    """
+    global TOKENIZER, EXTRACTOR, URL_FILTER
+    TOKENIZER = tokenizers.get_tokenizer(config.tokenizer)
+    EXTRACTOR = html_extract.EXTRACTORS[config.extractor]
+    URL_FILTER = UrlFilter(max_blocks=URL_LENGTH_THRESHOLD, cache_size=config.url_cache_size)
+
+
+def close():
+    """
+    Close the files the scraper keeps open, after writing every queued archive record.
+    """
+    global NEAR_DUPLICATES, CHECKSUMS
+    if json_utils.ARCHIVE_WRITER is not None:
+        json_utils.ARCHIVE_WRITER.close()
+        json_utils.ARCHIVE_WRITER = None
+    if NEAR_DUPLICATES is not None:
+        NEAR_DUPLICATES.close()
+        NEAR_DUPLICATES = None
+    if CHECKSUMS is not None:
+        CHECKSUMS.close()
+        CHECKSUMS = None
+
+
 def scraper(url, resp) -> set:
     """
     Check for bad url or bad response, text and tokenize, update archive word frequency,
     extract links, log, return links.
+    The three stages can also be run apart (see crawler/pipeline_worker.py):
+    prepare_page and finish_page use the scraper's state, parse_page does not.
     :return: a list of links
     """
-    # Check for Bad Response
-    if (resp.error is not None) or (400 <= resp.status <= 599) and (resp.raw_response is None): return []
+    content = prepare_page(url, resp)
+    if content is None:
+        return finish_page(url, None, ())
+    return finish_page(url, *parse_page(url, resp.url, content, resp.encoding))
+
+
+def report_new_links(url, new_links):
+    """
+    Called by the workers with the links scraped from url that were new to the frontier.
+    """
+    if TRAP_DETECTOR is not None:
+        TRAP_DETECTOR.record_links(url, new_links)
+
+
+def prepare_page(url, resp):
+    """
+    Checks done before parsing, returns the page content as bytes or None to skip it.
+    """
+    # Check for Bad Response (without unpickling the response)
+    if (resp.error is not None) or (400 <= resp.status <= 599) and (not resp.has_raw_response): return None
     # Check for Bad URL
-    if not is_valid(url): return []
+    if not is_valid(url): return None
+    # Unpickle the response only now, the body as bytes so that lxml decodes it itself
+    content = resp.content
+    if content is None: return None
+    # Check for a Body Already Scraped under another url (before parsing it)
+    if CHECKSUMS is not None and CHECKSUMS.canonical_url(url, content) is not None: return None
+    return content
 
-    # Convert to Text-Only
-    parsed_html = BeautifulSoup(resp.raw_response.text, features="lxml")
 
+def parse_page(url, base_url, content, encoding=None) -> tuple:
+    """
+    Text and tokenize the page content and extract its links, without using or changing
+    any state, so it can run in another process.
+    :param base_url: url the content was downloaded from, links are relative to it
+    :return: (Counter of token: count, set of links)
+    """
+    # Convert to Text-Only and collect the hrefs, in one pass
+    page_text, hrefs = EXTRACTOR(content, encoding)
     # Tokenize
-    # TODO: Discuss which tokenizer to use
-    token_list = TOKENIZER(parsed_html.text, ignore_stop_words=True)
-    # Filter Out Min # of Tokens
-    # TODO: Discuss if there's a better way to estimate
-    if len(token_list) < TOKEN_COUNT_THRESHOLD:
-        print(token_list)
-    if len(token_list) < TOKEN_COUNT_THRESHOLD: return []
-    # Word Frequency
-    # TODO: Validate
-    json_utils.archive_json_lines(url, token_list)
+    token_counts = TOKENIZER(page_text, ignore_stop_words=True)
     # Extract Links
+    return token_counts, extract_next_links(base_url, hrefs)
+
+
+def finish_page(url, token_counts, links) -> set:
+    """
+    Checks and updates done after parsing: token count and duplicate checks, archive
+    word frequency, outlier thresholds, trap detection. token_counts is None for pages
+    that were skipped.
+    :return: the links to crawl
+    """
+    token_count = sum(token_counts.values()) if token_counts is not None else 0
+    if THRESHOLDS is not None and token_counts is not None:
+        THRESHOLDS.observe(token_count, links)
+    links = archive_page(url, token_counts, token_count, links)
+    if THRESHOLDS is not None:
+        links = {link for link in links if not THRESHOLDS.too_deep(link)}
+    if TRAP_DETECTOR is not None:
+        TRAP_DETECTOR.record_page(url, token_count)
+        links = {link for link in links if TRAP_DETECTOR.admit(link)}
+    return links
+
+
+def archive_page(url, token_counts, token_count, links):
+    """
+    Archive the page's word frequency unless it is skipped, too short or a near duplicate.
+    :return: links, or no links if the page was not archived
+    """
+    if token_counts is None: return []
+    # Filter Out Min # of Tokens, and low-content outliers once THRESHOLDS learned them
+    if token_count < TOKEN_COUNT_THRESHOLD: return []
+    if THRESHOLDS is not None and THRESHOLDS.too_short(token_count): return []
+    # Skip Near Duplicates of archived pages
+    if NEAR_DUPLICATES is not None and NEAR_DUPLICATES.check_and_add(token_counts, url): return []
+    # Word Frequency
     # TODO: Validate
+    json_utils.archive_json_lines(url, token_counts)
     # with open("./Logs/URL_LOG.txt", "a+") as handle:
-    #     handle.write(f"{resp.url} {len(token_list)} {len(tokenizer.compute_word_frequency(token_list))} {len(links)}\n")
-    return {link for link in extract_next_links(url, resp, parsed_html) if is_valid(link)}
+    #     handle.write(f"{url} {token_count} {len(token_counts)} {len(links)}\n")
+    return links
 
 
-def extract_next_links(url, resp, parsed_html: BeautifulSoup) -> set:
+def extract_next_links(base_url, hrefs) -> set:
     """
-    Extract links from BeautifulSoup object. (currently doesn't account for dynamic web pages)
-    :param parsed_html: BeautifulSoup object
+    Extract links from the hrefs of the page's <a> tags. (currently doesn't account for dynamic web pages)
+    Each href is joined to the page url once, defragmented, stripped of its ?query
+    param(s), and checked by URL_FILTER for a valid url and for traps
+    (very long urls, 4-digit blocks, repeated blocks, sus keywords).
+    :param base_url: url of the page
+    :param hrefs: hrefs returned by EXTRACTOR
     :return: list of links
     """
     link_set = set()
-    # Removed BeautifulSoup object conversion from here, since it already happens in scraper().
-    # Instead added BeautifulSoup object as parameter to this function.
-
-    for link in [l.get("href") for l in parsed_html.find_all("a")]:
-        # Links are often located in either "href" or "src"
-        # link = link.get("href")  # if link.get("href") != None else link.get("src")
-
-        # Not email link, not section link (#link), and is a valid_link()
-        if link is not None \
-                and '@' not in link \
-                and "mailto" not in link \
-                and "img" not in link \
-                and "image" not in link \
-                and "events" not in link \
-                and "event" not in link \
-                and "pdf" not in link \
-                and "calendar" not in link \
-                and is_valid(urljoin(resp.url, link)):
-            # if url begins with '/', discard the path of the url and add the href path
-            # if url does not begin with '/' (e.g. something.html), append it to the end of the url path (urljoin)
-            # Defragment the URL
-            # Remove the ?query param(s) from url
-            link = urljoin(resp.url, link).split("#")[0].split("?")[0]
-
-            """
-            filter tips????:
-                - Avoid excessively long urls (or maybe just really long queries)
-                - Avoid paths containing 4-digits paths (e.g. .../2017/something.html)
-                - Avoid path w/ pdf in path (e.g., .../pdf/InformaticsBrochure)
-                - Avoid urls w/ parameters
-            """
-
-            # Look for a trap in the url (e.g., link to calendar, pdf, etc.)
-            is_trap = False
-            # check for very long url
-            if len(link.split('/')) > URL_LENGTH_THRESHOLD:
-                is_trap = True
-            else:
-                # check for 4 length digit block or sus keywords
-                for block in [i for i in link.split('/') if i]:  # removes empty strings
-                    # check for 4 length digit block
-                    if (len(block) == 4) and (block.isdigit()):
-                        is_trap = True
-                        break
-                    
-                    # check for repetitive blocks
-                    if link.count(block) > 1:
-                        is_trap = True
-                        break
-                    
-                    # check for sus keywords
-                    if block in {"calendar", "pdf", "reply", "respond", "comment", "event", "events", "img", "image"}:
-                        is_trap = True
-                        break
-            if is_trap: continue  # move to next for loop iteration
-
+    for href in hrefs:
+        link = URL_FILTER.next_link(base_url, href)
+        if link is not None:
             link_set.add(link)
     return link_set
 
 
 def is_valid(url):
     try:
-        parsed = urlparse(url)
-
-        # scheme check
-        if parsed.scheme not in set(["http", "https"]):
-            return False
-
-        # valid domain check
-        is_valid_domain = False
-        for domain in {".ics.uci.edu", ".cs.uci.edu", "informatics.uci.edu", "stat.uci.edu",
-                       "today.uci.edu/department/information_computer_sciences/"}:
-            if domain in url:
-                is_valid_domain = True
-        if is_valid_domain == False: return False  # Keep going if in valid domain
-
-        # file extension check
-        return not re.match(
-            r".*\.(css|js|bmp|gif|jpe?g|ico"
-            + r"|png|tiff?|mid|mp2|mp3|mp4"
-            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
-            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
-            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
-            + r"|epub|dll|cnf|tgz|sha1|mat|thesis"
-            + r"|thmx|mso|arff|rtf|jar|csv|apk|war"
-            + r"|rm|smil|wmv|swf|wma|zip|rar|gz|img"
-            + r"|py|ppsx|pps)$", parsed.path.lower())
-        # added img, war, apk, mat, thesis, pps, py
-
+        return URL_FILTER.is_valid(url)
     except TypeError:
-        print("TypeError for ", parsed)
+        print("TypeError for ", url)
         raise
@@ -0,0 +1,235 @@
+"""
+Compact binary term frequency archive, the json lines archive
+({url: {word: count}} per line) with every word stored once.
+
+Layout, all integers little endian:
+    header      HEADER: magic, version, page count, term count and the
+                offsets of the sections below
+    pages       per page: varint term count, then varint (term id delta,
+                count) pairs in term id order
+    page table  per page: uint64 offset of its record in pages, uint64
+                offset of its url in urls, in archive order
+    urls        per page: varint length, utf-8 url
+    url index   uint32 page numbers sorted by url, for binary search
+    terms       per term: varint length, utf-8 word, in id order
+    term table  per term: uint64 offset of the term in terms
+
+TermFrequencyArchive reads it through mmap, so iterating the pages or
+looking up one url only decodes what is used.
+
+    python tf_archive.py convert Logs/data_17723.json Logs/data_17723.tfa
+    python tf_archive.py show Logs/data_17723.tfa https://www.ics.uci.edu
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from archive_writer import archive_parts
+
+MAGIC = b"TFA1"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQQQQQQQ")
+PAGE_ENTRY = struct.Struct("<QQ")
+
+
+def encode_varint(value, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buffer, position) -> tuple:
+    """Returns (value, position after it)."""
+    result = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+class TermFrequencyWriter(object):
+    """
+    Writes a term frequency archive page by page. Only the term dictionary
+    and the url table are kept in memory, the tables are written by close().
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(b"\0" * HEADER.size)
+        self.term_ids = dict()      # word -> id
+        self.page_offsets = array("Q")
+        self.urls = list()
+
+    def add(self, url, word_freqs):
+        record = bytearray()
+        ids = sorted((self.term_ids.setdefault(word, len(self.term_ids)), count)
+                     for word, count in word_freqs.items())
+        encode_varint(len(ids), record)
+        previous = 0
+        for term_id, count in ids:
+            encode_varint(term_id - previous, record)
+            encode_varint(count, record)
+            previous = term_id
+        self.page_offsets.append(self.file.tell())
+        self.urls.append(url)
+        self.file.write(record)
+
+    def close(self):
+        page_table_offset = self.file.tell()
+        urls_offset = page_table_offset + PAGE_ENTRY.size * len(self.urls)
+        url_data = bytearray()
+        table = bytearray()
+        for page_offset, url in zip(self.page_offsets, self.urls):
+            table += PAGE_ENTRY.pack(page_offset, urls_offset + len(url_data))
+            encoded = url.encode("utf-8")
+            encode_varint(len(encoded), url_data)
+            url_data += encoded
+        self.file.write(table)
+        self.file.write(url_data)
+        url_index_offset = self.file.tell()
+        # Stable, so the last record of a url archived twice is found by bisecting right.
+        self.file.write(array("I", sorted(range(len(self.urls)), key=self.urls.__getitem__)).tobytes())
+        terms_offset = self.file.tell()
+        term_data = bytearray()
+        term_offsets = array("Q")
+        for word in self.term_ids:
+            term_offsets.append(terms_offset + len(term_data))
+            encoded = word.encode("utf-8")
+            encode_varint(len(encoded), term_data)
+            term_data += encoded
+        self.file.write(term_data)
+        term_table_offset = self.file.tell()
+        self.file.write(term_offsets.tobytes())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(
+            MAGIC, VERSION, len(self.urls), len(self.term_ids), page_table_offset,
+            urls_offset, url_index_offset, terms_offset, term_table_offset, 0))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TermFrequencyArchive(object):
+    """
+    Memory mapped reader of a term frequency archive. Iterating yields
+    (url, {word: count}) in archive order, get(url) finds one page by binary
+    search on the url index. Words are decoded once, when first used.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.page_count, self.term_count, self.page_table_offset,
+         _, self.url_index_offset, _, self.term_table_offset, _) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} term frequency archive.")
+        self.url_index = memoryview(self.buffer)[
+            self.url_index_offset:self.url_index_offset + 4 * self.page_count].cast("I")
+        self.term_table = memoryview(self.buffer)[
+            self.term_table_offset:self.term_table_offset + 8 * self.term_count].cast("Q")
+        self.terms = [None] * self.term_count
+
+    def __len__(self):
+        return self.page_count
+
+    def __iter__(self):
+        for page in range(self.page_count):
+            yield self.url(page), self.word_freqs(page)
+
+    def __contains__(self, url):
+        return self.find(url) is not None
+
+    def _page_entry(self, page) -> tuple:
+        return PAGE_ENTRY.unpack_from(self.buffer, self.page_table_offset + PAGE_ENTRY.size * page)
+
+    def url(self, page) -> str:
+        length, position = decode_varint(self.buffer, self._page_entry(page)[1])
+        return self.buffer[position:position + length].decode("utf-8")
+
+    def urls(self):
+        return (self.url(page) for page in range(self.page_count))
+
+    def term(self, term_id) -> str:
+        word = self.terms[term_id]
+        if word is None:
+            length, position = decode_varint(self.buffer, self.term_table[term_id])
+            word = self.terms[term_id] = self.buffer[position:position + length].decode("utf-8")
+        return word
+
+    def term_counts(self, page) -> list:
+        """[(term id, count)] of page, without decoding the words."""
+        buffer = self.buffer
+        size, position = decode_varint(buffer, self._page_entry(page)[0])
+        counts = list()
+        term_id = 0
+        for _ in range(size):
+            delta, position = decode_varint(buffer, position)
+            count, position = decode_varint(buffer, position)
+            term_id += delta
+            counts.append((term_id, count))
+        return counts
+
+    def word_freqs(self, page) -> dict:
+        return {self.term(term_id): count for term_id, count in self.term_counts(page)}
+
+    def find(self, url):
+        """Page number of the last record of url, or None."""
+        low, high = 0, self.page_count
+        while low < high:
+            middle = (low + high) // 2
+            if url < self.url(self.url_index[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        if low and self.url(self.url_index[low - 1]) == url:
+            return self.url_index[low - 1]
+        return None
+
+    def get(self, url):
+        """{word: count} of url, or None."""
+        page = self.find(url)
+        return None if page is None else self.word_freqs(page)
+
+    def close(self):
+        self.url_index.release()
+        self.term_table.release()
+        self.buffer.close()
+
+
+def convert_json_lines(json_path, archive_path) -> int:
+    """
+    Converts the json lines archive at json_path, with its rotated parts, to
+    a term frequency archive at archive_path, returns the number of pages.
+    """
+    with TermFrequencyWriter(archive_path) as writer:
+        for part in archive_parts(json_path):
+            with open(part, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        for url, word_freqs in json.loads(line).items():
+                            writer.add(url, word_freqs)
+        return len(writer.urls)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "convert":
+        pages = convert_json_lines(sys.argv[2], sys.argv[3])
+        json_size = sum(os.path.getsize(part) for part in archive_parts(sys.argv[2]))
+        print(f"{pages} pages, {json_size} bytes of json lines -> "
+              f"{os.path.getsize(sys.argv[3])} bytes")
+    elif len(sys.argv) == 4 and sys.argv[1] == "show":
+        archive = TermFrequencyArchive(sys.argv[2])
+        print(json.dumps({sys.argv[3]: archive.get(sys.argv[3])}, ensure_ascii=False))
+    else:
+        print(__doc__)
@@ -5,6 +5,7 @@
 
 from bs4 import BeautifulSoup
 from collections import defaultdict
+from functools import lru_cache
 import nltk
 from nltk.corpus import stopwords
 #nltk.download('stopwords')
@@ -12,6 +13,8 @@ import re
 import requests
 import time
 
+ALPHANUMERIC = re.compile("[a-zA-Z0-9]")
+
 
 """
 Token characteristics:
@@ -22,16 +25,25 @@ Token characteristics:
 """
 
 
-def tokenize(page:str) -> "list of tokens":
+@lru_cache(maxsize=None)
+def stop_words() -> frozenset:
+	"""
+	The NLTK stop words of every language, loaded once per process.
+	Raises LookupError if the stopwords corpus was not downloaded.
+	"""
+	return frozenset(stopwords.words())
+
+
+def tokenize(page:str, ignore_stop_words:bool = True) -> "list of tokens":
 
 	token_list = []
 
-	stop_words = stopwords.words()	# Save it here to prevent redundant calling
+	stop_word_set = stop_words() if ignore_stop_words else frozenset()
 
 	compact_page = page.replace('\n', ' ').replace('\t', ' ').replace('/', ' ')
 
 	for block in compact_page.split():
-		if (re.match("[a-zA-Z0-9]", block) != None):
+		if (ALPHANUMERIC.match(block) != None):
 			block = block.strip()
 
 			#if len
@@ -44,7 +56,7 @@ def tokenize(page:str) -> "list of tokens":
 				#if block[-1].isalpha() == False:
 				#	block = block[:-1]
 
-				if block not in stop_words: token_list.append(block)
+				if block not in stop_word_set: token_list.append(block)
 
 
 	return token_list
@@ -0,0 +1,38 @@
+from collections import Counter
+
+import ctoken
+import tokenizer
+
+# Tokenizer backends for the scraper, by TOKENIZER name. A backend is called
+# as backend(page_text, ignore_stop_words) and returns a Counter of
+# token: count. Backends load their resources (stop words, compiled
+# patterns) once per process, on first use, never per page.
+TOKENIZERS = dict()
+
+
+def register_tokenizer(name):
+    def register(backend):
+        TOKENIZERS[name] = backend
+        return backend
+    return register
+
+
+def get_tokenizer(name):
+    try:
+        return TOKENIZERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown TOKENIZER {name}, "
+            f"expected one of {', '.join(sorted(TOKENIZERS))}.")
+
+
+@register_tokenizer("ctoken")
+def ctoken_counts(page_text, ignore_stop_words=False) -> Counter:
+    """ ASCII tokens split on whitespace, '/', '-' and '&', english stop words. """
+    return ctoken.count_page(page_text, ignore_stop_words)
+
+
+@register_tokenizer("nltk")
+def nltk_counts(page_text, ignore_stop_words=False) -> Counter:
+    """ Whitespace separated blocks that are mostly alphanumeric, NLTK stop words of every language. """
+    return Counter(tokenizer.tokenize(page_text, ignore_stop_words))
@@ -0,0 +1,128 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+from threading import Lock
+from urllib.parse import urlsplit
+
+# Path blocks that vary between pages of the same kind.
+DATE_BLOCK = re.compile(r"\d{4}-\d{1,2}(?:-\d{1,2})?|\d{1,2}-\d{1,2}-\d{2,4}")
+ID_BLOCK = re.compile(r"(?=[a-z]*\d)[0-9a-f]{8,}|[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}",
+                      re.IGNORECASE)
+DIGITS = re.compile(r"\d+")
+
+
+@lru_cache(maxsize=65536)
+def url_template(url) -> tuple:
+    """
+    Collapses url into (host, template), where date-like, id-like and numeric
+    path blocks are wildcards, e.g. https://www.ics.uci.edu/events/2019-03-01/page-2
+    -> ("www.ics.uci.edu", "/events/{date}/page-{n}").
+    """
+    parts = urlsplit(url)
+    blocks = list()
+    for block in parts.path.split("/"):
+        if DATE_BLOCK.fullmatch(block):
+            blocks.append("{date}")
+        elif ID_BLOCK.fullmatch(block):
+            blocks.append("{id}")
+        else:
+            blocks.append(DIGITS.sub("{n}", block))
+    return (parts.hostname or ""), "/".join(blocks)
+
+
+class TemplateStats(object):
+    __slots__ = ("offered", "admitted", "fetched", "tokens", "new_links", "escaped_links", "state")
+
+    def __init__(self):
+        self.offered = 0        # links of the template scraped
+        self.admitted = 0       # of which were let into the frontier
+        self.fetched = 0        # pages of the template scraped
+        self.tokens = 0         # tokens on those pages
+        self.new_links = 0      # links on those pages new to the frontier
+        self.escaped_links = 0  # of which lead to another template
+        self.state = "open"     # "open", "throttled" or "cut"
+
+
+class TrapDetector(object):
+    """
+    Learns which url templates (see url_template) are traps from what their
+    pages yield. A template is judged once sample of its pages were scraped.
+    Its pages grow it when at least every other page links to a new page of
+    the same template, as in calendars and paginated archives, which never
+    run out of pages. They yield while they average at least min_yield new links to
+    other templates and min_tokens tokens. A template that grows without
+    yielding is throttled to 1 in throttle of its links, and cut off (no
+    more links) once cutoff of its pages were scraped. A throttled template
+    that yields again is reopened. Templates that do not grow (e.g. leaf
+    pages) are never throttled, their number of pages is bounded.
+    """
+    def __init__(self, sample=20, min_yield=0.5, min_tokens=50, throttle=10,
+                 cutoff=200, logger=None):
+        self.sample = sample
+        self.min_yield = min_yield
+        self.min_tokens = min_tokens
+        self.throttle = throttle
+        self.cutoff = cutoff
+        self.logger = logger
+        self.lock = Lock()
+        self.templates = defaultdict(TemplateStats)
+        self.dropped = 0
+
+    def admit(self, url) -> bool:
+        """Whether a newly scraped link should go to the frontier."""
+        with self.lock:
+            stats = self.templates[url_template(url)]
+            stats.offered += 1
+            if stats.state == "cut" or (
+                    stats.state == "throttled" and stats.offered % self.throttle):
+                self.dropped += 1
+                return False
+            stats.admitted += 1
+            return True
+
+    def record_page(self, url, tokens=0):
+        """Records a scraped page of url and the number of tokens it had."""
+        with self.lock:
+            template = url_template(url)
+            stats = self.templates[template]
+            stats.fetched += 1
+            stats.tokens += tokens
+            self._judge(template, stats)
+
+    def record_links(self, url, new_links):
+        """Records the links found on the page of url that were new to the frontier."""
+        template = url_template(url)
+        escaped = sum(1 for link in new_links if url_template(link) != template)
+        with self.lock:
+            stats = self.templates[template]
+            stats.new_links += len(new_links)
+            stats.escaped_links += escaped
+            self._judge(template, stats)
+
+    def _judge(self, template, stats):
+        if stats.fetched < self.sample:
+            return
+        grows = 2 * (stats.new_links - stats.escaped_links) >= stats.fetched
+        yielding = (stats.escaped_links >= self.min_yield * stats.fetched
+                    and stats.tokens >= self.min_tokens * stats.fetched)
+        if yielding or not grows:
+            state = "open"
+        elif stats.fetched >= self.cutoff:
+            state = "cut"
+        else:
+            state = "throttled"
+        if state != stats.state:
+            stats.state = state
+            if self.logger:
+                self.logger.info(
+                    f"Template {template[0]}{template[1]} is {state} after {stats.fetched} pages, "
+                    f"{stats.escaped_links / stats.fetched:.2f} new links out and "
+                    f"{stats.tokens / stats.fetched:.0f} tokens per page.")
+
+    def report(self, count=20) -> list:
+        """The count templates with the most scraped pages, with their stats."""
+        with self.lock:
+            ranked = sorted(self.templates.items(), key=lambda item: -item[1].fetched)
+            return [(host + path, stats.state, stats.fetched, stats.admitted,
+                     stats.new_links, stats.escaped_links, stats.tokens)
+                    for (host, path), stats in ranked[:count]]
@@ -0,0 +1,113 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urljoin
+
+SCHEMES = frozenset(["http", "https"])
+# Hosts (and their subdomains) to crawl, optionally restricted to a path prefix.
+DOMAINS = (".ics.uci.edu", ".cs.uci.edu", "informatics.uci.edu", "stat.uci.edu",
+           "today.uci.edu/department/information_computer_sciences/")
+EXTENSIONS = ("css|js|bmp|gif|jpe?g|ico"
+              "|png|tiff?|mid|mp2|mp3|mp4"
+              "|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
+              "|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
+              "|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
+              "|epub|dll|cnf|tgz|sha1|mat|thesis"
+              "|thmx|mso|arff|rtf|jar|csv|apk|war"
+              "|rm|smil|wmv|swf|wma|zip|rar|gz|img"
+              "|py|ppsx|pps")  # added img, war, apk, mat, thesis, pps, py
+# Substrings of an href that mark it as not a page, or a likely trap.
+LINK_KEYWORDS = ("@", "mailto", "img", "image", "events", "event", "pdf", "calendar")
+# Path blocks that mark a likely trap.
+TRAP_BLOCKS = frozenset(["calendar", "pdf", "reply", "respond", "comment",
+                         "event", "events", "img", "image"])
+
+
+class UrlFilter(object):
+    """
+    The url rules of the scraper, compiled once. Every url is split once and
+    the verdicts are kept in a bounded LRU cache, since the same navigation
+    links show up on nearly every page.
+
+    is_valid: scheme, allowed domain and file extension rules.
+    next_link: turns an href into the link to crawl (absolute, without
+    fragment and query), or None if it is malformed, fails is_valid, the
+    href keyword rules, or a trap rule: more than max_blocks '/' blocks, a 4
+    digit block, a block repeated in the path, or a trap keyword block.
+    """
+    def __init__(self, schemes=SCHEMES, domains=DOMAINS, extensions=EXTENSIONS,
+                 link_keywords=LINK_KEYWORDS, trap_blocks=TRAP_BLOCKS,
+                 max_blocks=100, cache_size=65536):
+        self.schemes = frozenset(schemes)
+        host_suffixes = list()
+        self.path_domains = list()    # (host, path prefix)
+        for domain in domains:
+            host, _, path = domain.partition("/")
+            if path:
+                self.path_domains.append((host, "/" + path))
+            else:
+                host = host.lstrip(".")
+                host_suffixes.append("." + host)
+                host_suffixes.append("//" + host)
+        # Matched against "//" + host, so a suffix also matches the exact host.
+        self.host_suffixes = tuple(host_suffixes)
+        self.extension = re.compile(rf"\.(?:{extensions})$")
+        self.link_keywords = re.compile("|".join(map(re.escape, link_keywords)))
+        self.trap_blocks = frozenset(trap_blocks)
+        self.max_blocks = max_blocks
+        self.cache_size = cache_size
+        self._valid = lru_cache(maxsize=cache_size)(self._is_valid)
+        self._link = lru_cache(maxsize=cache_size)(self._check_link)
+
+    def is_valid(self, url) -> bool:
+        return self._valid(url)
+
+    def next_link(self, base_url, href):
+        if self.link_keywords.search(href):
+            return None
+        try:
+            link = urljoin(base_url, href).split("#")[0].split("?")[0]
+            return link if self._link(link) else None
+        except ValueError:
+            # Malformed href, e.g. an invalid IPv6 host or port.
+            return None
+
+    def _is_valid(self, url) -> bool:
+        try:
+            return self._check_parts(urlsplit(url))
+        except ValueError:
+            return False
+
+    def _check_parts(self, parts) -> bool:
+        if parts.scheme not in self.schemes:
+            return False
+        host = parts.hostname or ""
+        if not ("//" + host).endswith(self.host_suffixes) and not any(
+                host == domain_host and parts.path.startswith(path)
+                for domain_host, path in self.path_domains):
+            return False
+        return not self.extension.search(parts.path.lower())
+
+    def _check_link(self, link) -> bool:
+        if not self._check_parts(urlsplit(link)):
+            return False
+        blocks = link.split("/")
+        if len(blocks) > self.max_blocks:
+            return False
+        seen_blocks = set()
+        for block in blocks:
+            if not block:
+                continue
+            if len(block) == 4 and block.isdigit():
+                return False
+            if block in seen_blocks or block in self.trap_blocks:
+                return False
+            seen_blocks.add(block)
+        return True
+
+    def cache_info(self) -> dict:
+        return {"is_valid": self._valid.cache_info(), "next_link": self._link.cache_info()}
+
+
+def url_blocks(url) -> int:
+    """Number of non-empty '/' blocks of url, as counted by json_utils.block_lengths_dict."""
+    return len([block for block in url.split('/') if block])
@@ -29,6 +29,10 @@ def get_urlhash(url):
         f"{parsed.netloc}/{parsed.path}/{parsed.params}/"
         f"{parsed.query}/{parsed.fragment}".encode("utf-8")).hexdigest()
 
+def url_fingerprint(urlhash):
+    """64-bit fingerprint of a url, taken from its get_urlhash hex digest."""
+    return int(urlhash[:16], 16) or 1
+
 def normalize(url):
     if url.endswith("/"):
         return url.rstrip("/")
@@ -8,12 +8,94 @@ class Config(object):
         assert self.user_agent != "DEFAULT AGENT", "Set useragent in config.ini"
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
+        self.process_count = config["LOCAL PROPERTIES"].getint("PROCESSCOUNT", 1)
+        self.archive_file = config["LOCAL PROPERTIES"].get(
+            "ARCHIVE", "Logs/data_17723.json")
+        self.archive_writer = config["LOCAL PROPERTIES"].getboolean("ARCHIVE_WRITER", True)
+        self.archive_flush_records = config["LOCAL PROPERTIES"].getint(
+            "ARCHIVE_FLUSH_RECORDS", 512)
+        self.archive_flush_ms = config["LOCAL PROPERTIES"].getint("ARCHIVE_FLUSH_MS", 1000)
+        self.archive_fsync = config["LOCAL PROPERTIES"].getboolean("ARCHIVE_FSYNC", False)
+        self.archive_rotate_mb = config["LOCAL PROPERTIES"].getint("ARCHIVE_ROTATE_MB", 0)
+        self.near_duplicates_file = config["LOCAL PROPERTIES"].get(
+            "NEAR_DUPLICATES", "Logs/near_duplicates.bin")
+        self.checksums_file = config["LOCAL PROPERTIES"].get("CHECKSUMS", "Logs/checksums.txt")
+        self.aliases_file = config["LOCAL PROPERTIES"].get("ALIASES", "Logs/aliases.txt")
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
+        self.journal_file = config["LOCAL PROPERTIES"].get(
+            "JOURNAL", f"{self.save_file}.journal")
+        self.journal_flush_records = config["LOCAL PROPERTIES"].getint(
+            "JOURNAL_FLUSH_RECORDS", 256)
+        self.journal_flush_ms = config["LOCAL PROPERTIES"].getint(
+            "JOURNAL_FLUSH_MS", 1000)
+        self.journal_compact_records = config["LOCAL PROPERTIES"].getint(
+            "JOURNAL_COMPACT_RECORDS", 50000)
+        self.pending_file = config["LOCAL PROPERTIES"].get(
+            "PENDING", f"{self.save_file}.pending")
+        self.seen_file = config["LOCAL PROPERTIES"].get(
+            "SEEN", f"{self.save_file}.seen")
+        self.lazy_resume = config["LOCAL PROPERTIES"].getboolean(
+            "LAZY_RESUME", False)
+        self.frontier_memory_urls = config["LOCAL PROPERTIES"].getint(
+            "FRONTIER_MEMORY_URLS", 0)
+        self.spill_dir = config["LOCAL PROPERTIES"].get(
+            "SPILL_DIR", f"{self.save_file}.spill")
+        self.spill_segment_urls = config["LOCAL PROPERTIES"].getint(
+            "SPILL_SEGMENT_URLS", 10000)
+        self.seen_set = config["LOCAL PROPERTIES"].get("SEEN_SET", "exact")
+        assert self.seen_set in ("exact", "bloom"), "SEEN_SET should be 'exact' or 'bloom'"
+        self.seen_set_capacity = config["LOCAL PROPERTIES"].getint(
+            "SEEN_SET_CAPACITY", 1000000)
+        self.bloom_error_rate = config["LOCAL PROPERTIES"].getfloat(
+            "BLOOM_ERROR_RATE", 0.001)
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
+        self.tokenizer = config["CRAWLER"].get("TOKENIZER", "ctoken")
+        self.extractor = config["CRAWLER"].get("EXTRACTOR", "lxml")
+        assert self.extractor in ("lxml", "bs4"), "EXTRACTOR should be 'lxml' or 'bs4'"
+        self.frontier_order = config["CRAWLER"].get("FRONTIER_ORDER", "lifo")
+        assert self.frontier_order in ("lifo", "priority"), "FRONTIER_ORDER should be 'lifo' or 'priority'"
+        self.priority_scorer = config["CRAWLER"].get("PRIORITY_SCORER", "depth")
+        self.url_cache_size = config["CRAWLER"].getint("URL_CACHE_SIZE", 65536)
+        self.trap_detection = config["CRAWLER"].getboolean("TRAP_DETECTION", True)
+        self.trap_sample = config["CRAWLER"].getint("TRAP_SAMPLE", 20)
+        self.trap_min_yield = config["CRAWLER"].getfloat("TRAP_MIN_YIELD", 0.5)
+        self.trap_min_tokens = config["CRAWLER"].getint("TRAP_MIN_TOKENS", 50)
+        self.trap_throttle = config["CRAWLER"].getint("TRAP_THROTTLE", 10)
+        self.trap_cutoff = config["CRAWLER"].getint("TRAP_CUTOFF", 200)
+        self.exact_duplicate_detection = config["CRAWLER"].getboolean(
+            "EXACT_DUPLICATE_DETECTION", True)
+        self.near_duplicate_detection = config["CRAWLER"].getboolean(
+            "NEAR_DUPLICATE_DETECTION", True)
+        self.near_duplicate_distance = config["CRAWLER"].getint("NEAR_DUPLICATE_DISTANCE", 3)
+        self.adaptive_thresholds = config["CRAWLER"].getboolean("ADAPTIVE_THRESHOLDS", True)
+        self.adaptive_min_pages = config["CRAWLER"].getint("ADAPTIVE_MIN_PAGES", 200)
+        self.adaptive_update_pages = config["CRAWLER"].getint("ADAPTIVE_UPDATE_PAGES", 100)
+        self.outlier_iqr_multiplier = config["CRAWLER"].getfloat("OUTLIER_IQR_MULTIPLIER", 1.5)
+
+        self.download_timeout = config["CONNECTION"].getfloat("TIMEOUT", 30)
+        self.pool_size = config["CONNECTION"].getint("POOL_SIZE", 10)
+        self.download_retries = config["CONNECTION"].getint("RETRIES", 3)
+        self.download_backoff = config["CONNECTION"].getfloat("BACKOFF", 0.5)
+
+        self.worker = config["LOCAL PROPERTIES"].get("WORKER", "thread")
+        assert self.worker in ("thread", "async", "pipeline"), "WORKER should be 'thread', 'async' or 'pipeline'"
+        self.async_concurrency = config["LOCAL PROPERTIES"].getint(
+            "ASYNC_CONCURRENCY", 200)
+        self.async_parsers = config["LOCAL PROPERTIES"].getint("ASYNC_PARSERS", 2)
+        self.parse_processes = config["LOCAL PROPERTIES"].getint("PARSE_PROCESSES", 0)
+        self.parse_queue = config["LOCAL PROPERTIES"].getint("PARSE_QUEUE", 64)
+
+        self.response_store = config["LOCAL PROPERTIES"].get(
+            "RESPONSE_STORE", "Logs/responses.store")
+        self.response_mode = config["LOCAL PROPERTIES"].get("RESPONSE_MODE", "live")
+        assert self.response_mode in ("live", "record", "replay"), "RESPONSE_MODE should be 'live', 'record' or 'replay'"
+        if self.response_mode == "replay":
+            # Replayed responses come from disk, there is no server to be polite to.
+            self.time_delay = 0
 
         self.cache_server = None
\ No newline at end of file
@@ -2,23 +2,115 @@ import requests
 import cbor
 import time
 
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from utils.response import Response
+from utils.response_store import get_store, store_paths
+
+_client = None
+_client_lock = Lock()
 
 def download(url, config, logger=None):
     # Has been edited from original
+    return get_client(config).download(url, logger)
+
+def download_many(urls, config, logger=None):
+    """Downloads a list of urls over the pooled connections, returns their responses in order."""
+    return get_client(config).download_many(urls, logger)
+
+def get_client(config):
+    """Returns the process wide DownloadClient for config."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.config is not config:
+            _client = DownloadClient(config)
+        return _client
+
+def to_response(url, status_code, content, logger=None):
+    """Builds the Response for the cache server's reply to a request for url."""
     try:
-        host, port = config.cache_server
-        resp = requests.get(
-            f"http://{host}:{port}/",
-            params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
-        if len(resp.content) == 0: # added due to "ValueError: got zero length string in loads"
+        if len(content) == 0: # added due to "ValueError: got zero length string in loads"
             return Response({"url": "", "status": 404, "error": ""})
-        if resp:
-            return Response(cbor.loads(resp.content))
-    except EOFError or ValueError:  # "ValueError: got zero length string in loads"
+        if status_code < 400:
+            return Response(cbor.loads(content))
+    except (EOFError, ValueError):  # "ValueError: got zero length string in loads"
         return Response({"url": "", "status": 404, "error": ""})
-    logger.error(f"Spacetime Response error {resp} with url {url}.")
+    if logger:
+        logger.error(f"Spacetime Response error {status_code} with url {url}.")
     return Response({
-        "error": f"Spacetime Response error {resp} with url {url}.",
-        "status": resp.status_code,
+        "error": f"Spacetime Response error {status_code} with url {url}.",
+        "status": status_code,
         "url": url})
+
+
+class DownloadClient(object):
+    """
+    Downloads from the cache server through one requests.Session shared by
+    every thread, so connections are kept alive and reused instead of opened
+    per url. The session keeps up to config.pool_size connections alive
+    (connections beyond that are closed after their request) and retries
+    connection errors and 5xx replies config.download_retries times with
+    exponential backoff. In record mode every reply is also appended to the
+    response store, in replay mode replies only come from the store.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.store = None
+        self.replay_stores = list()
+        if config.response_mode == "record":
+            self.store = get_store(config.response_store)
+        elif config.response_mode == "replay":
+            self.replay_stores = [get_store(path) for path in store_paths(config.response_store)]
+        if config.cache_server is not None:
+            host, port = config.cache_server
+            self.cache_url = f"http://{host}:{port}/"
+        retry = Retry(
+            total=config.download_retries,
+            backoff_factor=config.download_backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=config.pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+
+    def download(self, url, logger=None):
+        if self.config.response_mode == "replay":
+            return self.replay(url, logger)
+        try:
+            resp = self.session.get(
+                self.cache_url,
+                params=[("q", f"{url}"), ("u", f"{self.config.user_agent}")],
+                timeout=self.config.download_timeout)
+        except requests.RequestException as error:
+            if logger:
+                logger.error(f"Failed to download {url}: {error!r}")
+            return Response({"error": repr(error), "status": 600, "url": url})
+        if self.store is not None:
+            self.store.append(url, resp.status_code, resp.content)
+        return to_response(url, resp.status_code, resp.content, logger)
+
+    def replay(self, url, logger=None):
+        recorded = None
+        for store in self.replay_stores:
+            recorded = store.get(url)
+            if recorded is not None:
+                break
+        if recorded is None:
+            if logger:
+                logger.error(f"No recorded response for url {url}.")
+            return Response({
+                "error": f"No recorded response for url {url}.",
+                "status": 404,
+                "url": url})
+        status_code, content = recorded
+        return to_response(url, status_code, content, logger)
+
+    def download_many(self, urls, logger=None):
+        """Downloads urls from pool_size threads sharing the session's connections."""
+        with ThreadPoolExecutor(self.config.pool_size) as executor:
+            return list(executor.map(lambda url: self.download(url, logger), urls))
@@ -0,0 +1,113 @@
+import math
+from array import array
+
+
+class FingerprintSet(object):
+    """
+    Exact set of nonzero 64-bit fingerprints (of urls, of bodies) in an
+    open-addressing table backed by an array, about 8 bytes per slot instead
+    of ~70 bytes per entry of a set of ints. Two urls only collide if their
+    sha256 prefixes are equal.
+    """
+    MAX_LOAD = 0.6
+
+    def __init__(self, capacity=1 << 16):
+        slots = 1 << max(4, math.ceil(math.log2(capacity / self.MAX_LOAD)))
+        self.table = array("Q", bytes(8 * slots))
+        self.mask = slots - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, fingerprint):
+        table, mask = self.table, self.mask
+        index = fingerprint & mask
+        while table[index]:
+            if table[index] == fingerprint:
+                return True
+            index = (index + 1) & mask
+        return False
+
+    def add(self, fingerprint):
+        """Adds the fingerprint, returns False if it was already present."""
+        table, mask = self.table, self.mask
+        index = fingerprint & mask
+        while table[index]:
+            if table[index] == fingerprint:
+                return False
+            index = (index + 1) & mask
+        table[index] = fingerprint
+        self.count += 1
+        if self.count > self.MAX_LOAD * len(table):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self.table
+        self.table = array("Q", bytes(16 * len(old)))
+        self.mask = len(self.table) - 1
+        self.count = 0
+        for fingerprint in old:
+            if fingerprint:
+                self.add(fingerprint)
+
+    def memory_bytes(self):
+        return self.table.itemsize * len(self.table)
+
+    def false_positive_rate(self):
+        # Chance that a new url matches the 64-bit prefix of any stored one.
+        return self.count / 2 ** 64
+
+
+class FingerprintDict(FingerprintSet):
+    """
+    FingerprintSet mapping every fingerprint to a 64-bit value, kept in an
+    array parallel to the table, about 16 bytes per slot.
+    """
+    def __init__(self, capacity=1 << 16):
+        super().__init__(capacity)
+        self.values = array("Q", bytes(8 * len(self.table)))
+
+    def get(self, fingerprint, default=None):
+        table, mask = self.table, self.mask
+        index = fingerprint & mask
+        while table[index]:
+            if table[index] == fingerprint:
+                return self.values[index]
+            index = (index + 1) & mask
+        return default
+
+    def __setitem__(self, fingerprint, value):
+        table, mask = self.table, self.mask
+        index = fingerprint & mask
+        while table[index]:
+            if table[index] == fingerprint:
+                self.values[index] = value
+                return
+            index = (index + 1) & mask
+        table[index] = fingerprint
+        self.values[index] = value
+        self.count += 1
+        if self.count > self.MAX_LOAD * len(table):
+            self._grow()
+
+    def add(self, fingerprint):
+        """Adds the fingerprint with value 0, returns False if it was already present."""
+        if fingerprint in self:
+            return False
+        self[fingerprint] = 0
+        return True
+
+    def _grow(self):
+        old_table, old_values = self.table, self.values
+        self.table = array("Q", bytes(16 * len(old_table)))
+        self.values = array("Q", bytes(16 * len(old_table)))
+        self.mask = len(self.table) - 1
+        self.count = 0
+        for fingerprint, value in zip(old_table, old_values):
+            if fingerprint:
+                self[fingerprint] = value
+
+    def memory_bytes(self):
+        return super().memory_bytes() + self.values.itemsize * len(self.values)
@@ -1,14 +1,51 @@
 import pickle
 
 class Response(object):
+    """
+    url, status and error are read from the cache server reply right away.
+    The pickled requests.Response is only unpickled, once, when raw_response
+    or a property built on it is first used, so pages that are dropped early
+    (bad status, invalid url) cost nothing to decode.
+    """
     def __init__(self, resp_dict):
         self.url = resp_dict["url"]
         self.status = resp_dict["status"]
         self.error = resp_dict["error"] if "error" in resp_dict else None
-        try:
-            self.raw_response = (
-                pickle.loads(resp_dict["response"])
-                if "response" in resp_dict else
-                None)
-        except TypeError:
-            self.raw_response = None
+        self._pickled = resp_dict["response"] if "response" in resp_dict else None
+        self._raw_response = None
+
+    @property
+    def raw_response(self):
+        if self._pickled is not None:
+            try:
+                self._raw_response = pickle.loads(self._pickled)
+            except TypeError:
+                self._raw_response = None
+            # The pickle is not needed anymore.
+            self._pickled = None
+        return self._raw_response
+
+    @property
+    def has_raw_response(self):
+        """Whether there is a raw_response, without unpickling it."""
+        return self._pickled is not None or self._raw_response is not None
+
+    @property
+    def content(self):
+        """The page content as bytes, or None."""
+        raw_response = self.raw_response
+        return raw_response.content if raw_response is not None else None
+
+    @property
+    def content_type(self):
+        raw_response = self.raw_response
+        return raw_response.headers.get("Content-Type") if raw_response is not None else None
+
+    @property
+    def encoding(self):
+        """The charset declared in the Content-Type header, or None."""
+        for param in (self.content_type or "").split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "charset" and value:
+                return value.strip("\"'")
+        return None
@@ -0,0 +1,94 @@
+import glob
+import os
+import struct
+
+from threading import Lock
+
+from utils import get_urlhash
+
+# Record header: sha256 of get_urlhash, http status, payload length.
+HEADER = struct.Struct("<32sHI")
+
+_stores = dict()
+_stores_lock = Lock()
+
+def get_store(path):
+    """Returns the process wide ResponseStore for path."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ResponseStore(path)
+        return _stores[path]
+
+
+def store_paths(path) -> list:
+    """
+    The stores to replay for path: path and the shards recorded by a sharded
+    crawl (see crawler/sharded.py), e.g. responses.shard0.store.
+    """
+    root, ext = os.path.splitext(path)
+    paths = sorted(glob.glob(f"{glob.escape(root)}.shard[0-9]*{ext}"))
+    return [path] + paths if os.path.exists(path) or not paths else paths
+
+
+class ResponseStore(object):
+    """
+    Append-only file of raw cache server replies (the cbor payloads), keyed
+    by get_urlhash. Used to record a crawl and replay it offline through the
+    same Response path. Later records for a url replace earlier ones.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.index = dict()     # url hash digest -> (status, offset, length)
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.file = open(path, "a+b")
+        self._load_index()
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        offset = 0
+        while offset + HEADER.size <= size:
+            key, status, length = HEADER.unpack(
+                os.pread(self.file.fileno(), HEADER.size, offset))
+            if offset + HEADER.size + length > size:
+                break
+            self.index[key] = (status, offset + HEADER.size, length)
+            offset += HEADER.size + length
+        if offset < size:
+            # Drop a record torn by a crash while recording.
+            self.file.truncate(offset)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, url):
+        return bytes.fromhex(get_urlhash(url)) in self.index
+
+    def __iter__(self):
+        """Yields (status, payload) of every recorded url."""
+        for status, offset, length in list(self.index.values()):
+            yield status, os.pread(self.file.fileno(), length, offset)
+
+    def get(self, url):
+        """Returns (status, payload) recorded for url, or None."""
+        entry = self.index.get(bytes.fromhex(get_urlhash(url)))
+        if entry is None:
+            return None
+        status, offset, length = entry
+        return status, os.pread(self.file.fileno(), length, offset)
+
+    def append(self, url, status, payload):
+        key = bytes.fromhex(get_urlhash(url))
+        with self.lock:
+            self.file.seek(0, os.SEEK_END)
+            offset = self.file.tell() + HEADER.size
+            self.file.write(HEADER.pack(key, status, len(payload)))
+            self.file.write(payload)
+            self.file.flush()
+            self.index[key] = (status, offset, len(payload))
+
+    def close(self):
+        with self.lock:
+            self.file.close()